@@ -1,17 +1,112 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
 from accounts.models import Token, User
+from superlists.db import retrying_transaction
+
+class UserCache:
+  def __init__(self, maxsize, ttl):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self.hits = 0
+    self.misses = 0
+    self._users = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      entry = self._users.get(key)
+      if entry is None or entry[1] <= time.monotonic():
+        self._users.pop(key, None)
+        self.misses += 1
+        return None
+      self._users.move_to_end(key)
+      self.hits += 1
+      return entry[0]
+
+  def set(self, key, user):
+    with self._lock:
+      self._users[key] = (user, time.monotonic() + self.ttl)
+      self._users.move_to_end(key)
+      while len(self._users) > self.maxsize:
+        self._users.popitem(last=False)
+
+  def invalidate(self, key):
+    with self._lock:
+      self._users.pop(key, None)
+
+  def clear(self):
+    with self._lock:
+      self._users.clear()
+      self.hits = 0
+      self.misses = 0
+
+
+user_cache = UserCache(
+  maxsize=settings.USER_CACHE_MAX_SIZE,
+  ttl=settings.USER_CACHE_TTL,
+)
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+  user_cache.invalidate(instance.pk)
+
 
 class PasswordlessAuthenticationBackend:
   def authenticate(self, request, uid):
     try:
-      token = Token.objects.get(uid=uid)
+      token = Token.objects.get(uid=uuid.UUID(str(uid)))
+    except (ValueError, Token.DoesNotExist):
+      return None
+    # Tokens are single use: only the request that deletes it may log in.
+    deleted, _ = Token.objects.filter(pk=token.pk).delete()
+    if not deleted or token.expires_at <= timezone.now():
+      return None
+    try:
       return User.objects.get(email=token.email)
     except User.DoesNotExist:
       return User.objects.create(email=token.email)
-    except Token.DoesNotExist:
+
+  async def aauthenticate(self, request, uid):
+    authenticate = retrying_transaction(self.authenticate)
+    return await sync_to_async(authenticate)(request, uid)
+
+  # Sessions from before users had integer ids hold their email instead;
+  # they are treated as logged out.
+  def get_user(self, user_id):
+    try:
+      user_id = int(user_id)
+    except (TypeError, ValueError):
+      return None
+    user = user_cache.get(user_id)
+    if user is not None:
+      return user
+    try:
+      user = User.objects.get(pk=user_id)
+    except User.DoesNotExist:
+      return None
+    user_cache.set(user_id, user)
+    return user
+
+  async def aget_user(self, user_id):
+    try:
+      user_id = int(user_id)
+    except (TypeError, ValueError):
       return None
-    
-  def get_user(self, email):
+    user = user_cache.get(user_id)
+    if user is not None:
+      return user
     try:
-      return User.objects.get(email=email)
+      user = await User.objects.aget(pk=user_id)
     except User.DoesNotExist:
-      return None
\ No newline at end of file
+      return None
+    user_cache.set(user_id, user)
+    return user
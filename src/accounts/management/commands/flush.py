@@ -0,0 +1,10 @@
+from django.core.management.commands import flush
+
+# Every server process caches users by id, so a flushed database carries on
+# counting ids instead of giving a new user an id another process still
+# has cached for someone else. Django's test cases pass reset_sequences
+# themselves.
+class Command(flush.Command):
+  def handle(self, **options):
+    options.setdefault('reset_sequences', False)
+    return super().handle(**options)
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import Token
+
+class Command(BaseCommand):
+  help = 'Delete expired login tokens in small batches'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--pause', type=float, default=0.05)
+
+  def handle(self, *args, **options):
+    now = timezone.now()
+    deleted = 0
+    while True:
+      # Each batch is its own short transaction so writers are never
+      # locked out of the database for long.
+      with transaction.atomic():
+        ids = list(
+          Token.objects.filter(expires_at__lte=now)
+          .values_list('id', flat=True)[:options['batch_size']]
+        )
+        if ids:
+          deleted += Token.objects.filter(id__in=ids).delete()[0]
+      if len(ids) < options['batch_size']:
+        break
+      time.sleep(options['pause'])
+    self.stdout.write(f'Deleted {deleted} expired tokens')
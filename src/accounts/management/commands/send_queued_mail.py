@@ -0,0 +1,46 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from accounts.outbox import MAX_ATTEMPTS, send_queued_mail
+from superlists.db import is_locked_error
+
+class Command(BaseCommand):
+  help = 'Send the emails waiting in the outbox'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--max-attempts', type=int, default=MAX_ATTEMPTS)
+    parser.add_argument('--interval', type=float, default=1.0)
+    parser.add_argument('--once', action='store_true')
+
+  def handle(self, *args, **options):
+    connection = get_connection()
+    try:
+      while True:
+        try:
+          sent, failed = send_queued_mail(
+            connection,
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+          )
+        except OperationalError as e:
+          # Still locked after the writes' own retries: wait and go again
+          # rather than leave the outbox with no worker.
+          if not is_locked_error(e):
+            raise
+          self.stderr.write(f'Outbox not sent: {e}')
+          time.sleep(options['interval'])
+          continue
+        if sent or failed:
+          self.stdout.write(f'Sent {sent} emails, {failed} failed')
+        if sent + failed < options['batch_size']:
+          if options['once']:
+            break
+          # Idle: don't hold the SMTP connection open between polls.
+          connection.close()
+          time.sleep(options['interval'])
+    finally:
+      connection.close()
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    replaces = [
+        ('accounts', '0001_initial'),
+        ('accounts', '0002_remove_user_id_alter_user_email'),
+    ]
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    # lists.0007 points the owner at the email primary key, so a new
+    # database has to make that key before it adds the column.
+    run_before = [
+        ('lists', '0007_list_owner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('email', models.EmailField(max_length=254, primary_key=True, serialize=False)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:35
+
+import accounts.models
+import uuid
+from django.db import migrations, models
+
+
+def compact_uids(apps, schema_editor):
+    # Rewrite hyphenated uids in the 32 character form UUIDField stores.
+    Token = apps.get_model('accounts', 'Token')
+    for token in Token.objects.only('uid').iterator():
+        try:
+            compact = uuid.UUID(token.uid).hex
+        except ValueError:
+            token.delete()
+            continue
+        Token.objects.filter(pk=token.pk).update(uid=compact)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(compact_uids, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='token',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True, default=accounts.models.token_expiry),
+        ),
+        migrations.AlterField(
+            model_name='token',
+            name='uid',
+            field=models.UUIDField(default=uuid.uuid4, unique=True),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def number_users(apps, schema_editor):
+    User = apps.get_model('accounts', 'User')
+    users = User.objects.using(schema_editor.connection.alias)
+    next_id = (users.aggregate(models.Max('id'))['id__max'] or 0) + 1
+    while True:
+        batch = list(users.filter(id__isnull=True).order_by('email')[:BATCH_SIZE])
+        if not batch:
+            break
+        for user in batch:
+            user.id = next_id
+            next_id += 1
+        users.bulk_update(batch, ['id'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_token_uid_uuid_expires_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='id',
+            field=models.BigIntegerField(null=True, unique=True),
+        ),
+        migrations.RunPython(number_users, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+
+# Moving the primary key means rebuilding the table, which Django can't do
+# in one operation while it has two primary key candidates. Lists no longer
+# know their owners' emails by now, so there is no way back.
+FORWARDS = [
+    'CREATE TABLE "new__accounts_user" ('
+    '"id" integer NOT NULL PRIMARY KEY AUTOINCREMENT, '
+    '"email" varchar(254) NOT NULL UNIQUE)',
+    'INSERT INTO "new__accounts_user" ("id", "email") '
+    'SELECT "id", "email" FROM "accounts_user"',
+    'DROP TABLE "accounts_user"',
+    'ALTER TABLE "new__accounts_user" RENAME TO "accounts_user"',
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_id'),
+        ('lists', '0013_list_owner'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(FORWARDS),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name='user',
+                    name='id',
+                    field=models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID'),
+                ),
+                migrations.AlterField(
+                    model_name='user',
+                    name='email',
+                    field=models.EmailField(max_length=254, unique=True),
+                ),
+            ],
+        ),
+    ]
@@ -1,9 +1,11 @@
 import uuid
 
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class User(models.Model):
-  email = models.EmailField(primary_key=True)
+  email = models.EmailField(unique=True)
 
   REQUIRED_FIELDS = []
   USERNAME_FIELD = 'email'
@@ -11,6 +13,21 @@ class User(models.Model):
   is_authenticated = True
 
 
+def token_expiry():
+  return timezone.now() + settings.LOGIN_TOKEN_MAX_AGE
+
+
 class Token(models.Model):
   email = models.EmailField()
-  uid = models.CharField(default=uuid.uuid4, max_length=40)
+  uid = models.UUIDField(default=uuid.uuid4, unique=True)
+  expires_at = models.DateTimeField(default=token_expiry, db_index=True)
+
+
+class OutgoingEmail(models.Model):
+  subject = models.CharField(max_length=255)
+  body = models.TextField()
+  from_email = models.EmailField()
+  to_email = models.EmailField()
+  send_after = models.DateTimeField(default=timezone.now, db_index=True)
+  attempts = models.PositiveSmallIntegerField(default=0)
+  last_error = models.TextField(blank=True, default='')
@@ -0,0 +1,60 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage
+from django.utils import timezone
+
+from accounts.models import OutgoingEmail
+from superlists.db import retrying_transaction
+
+MAX_ATTEMPTS = 5
+RETRY_DELAY = timedelta(seconds=30)
+MAX_RETRY_DELAY = timedelta(hours=1)
+
+def queue_mail(subject, body, from_email, to_email):
+  return OutgoingEmail.objects.create(
+    subject=subject,
+    body=body,
+    from_email=from_email,
+    to_email=to_email,
+  )
+
+def retry_delay(attempts):
+  return min(RETRY_DELAY * 2 ** min(attempts - 1, 16), MAX_RETRY_DELAY)
+
+def send_queued_mail(connection, batch_size=50, max_attempts=MAX_ATTEMPTS):
+  now = timezone.now()
+  batch = list(
+    OutgoingEmail.objects
+    .filter(send_after__lte=now, attempts__lt=max_attempts)
+    .order_by('send_after', 'id')[:batch_size]
+  )
+  sent_ids = []
+  failed = 0
+  for email in batch:
+    message = EmailMessage(
+      email.subject,
+      email.body,
+      email.from_email,
+      [email.to_email],
+      connection=connection,
+    )
+    try:
+      # A no-op when already open, so one connection serves the whole batch.
+      connection.open()
+      message.send()
+    except Exception as e:
+      connection.close()
+      email.attempts += 1
+      email.send_after = now + retry_delay(email.attempts)
+      email.last_error = repr(e)
+      retrying_transaction(email.save)(
+        update_fields=['attempts', 'send_after', 'last_error']
+      )
+      failed += 1
+    else:
+      sent_ids.append(email.id)
+  retrying_transaction(_delete_sent)(sent_ids)
+  return len(sent_ids), failed
+
+def _delete_sent(ids):
+  OutgoingEmail.objects.filter(id__in=ids).delete()
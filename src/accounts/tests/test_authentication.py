@@ -1,8 +1,15 @@
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
 from django.http import HttpRequest
 from django.test import TestCase
+from django.utils import timezone
 
 from accounts.authentication import (
-  PasswordlessAuthenticationBackend as AuthBackend
+  PasswordlessAuthenticationBackend as AuthBackend,
+  UserCache,
+  user_cache,
 )
 from accounts.models import Token, User
 
@@ -26,19 +33,102 @@ class AuthenticateTest(TestCase):
     user = AuthBackend().authenticate(HttpRequest(), token.uid)
     self.assertEqual(user, existing_user)
 
+  def test_accepts_uid_as_string(self):
+    token = Token.objects.create(email='edith@example.com')
+    user = AuthBackend().authenticate(HttpRequest(), str(token.uid))
+    self.assertEqual(user.email, 'edith@example.com')
+
+  def test_token_can_only_be_used_once(self):
+    token = Token.objects.create(email='edith@example.com')
+    AuthBackend().authenticate(HttpRequest(), token.uid)
+    self.assertIsNone(AuthBackend().authenticate(HttpRequest(), token.uid))
+    self.assertFalse(Token.objects.exists())
+
+  def test_returns_None_if_token_expired(self):
+    token = Token.objects.create(
+      email='edith@example.com',
+      expires_at=timezone.now() - timedelta(seconds=1),
+    )
+    self.assertIsNone(AuthBackend().authenticate(HttpRequest(), token.uid))
+    self.assertFalse(User.objects.exists())
+
+  async def test_async_authenticate_logs_in_once(self):
+    token = await Token.objects.acreate(email='edith@example.com')
+    user = await AuthBackend().aauthenticate(HttpRequest(), token.uid)
+    self.assertEqual(user.email, 'edith@example.com')
+    again = await AuthBackend().aauthenticate(HttpRequest(), token.uid)
+    self.assertIsNone(again)
+
 
 class GetUserTest(TestCase):
 
-  def test_get_user_by_email(self):
+  def setUp(self):
+    user_cache.clear()
+
+  def test_get_user_by_id(self):
     User.objects.create(email='another@example.com')
     desired_user = User.objects.create(email='edith@example.com')
-    found_user = AuthBackend().get_user('edith@example.com')
+    found_user = AuthBackend().get_user(desired_user.pk)
     self.assertEqual(found_user, desired_user)
 
-  def test_returns_None_if_no_user_with_that_email(self):
-    User.objects.create(email='another@example.com')
-    result = AuthBackend().get_user('edith@example.com')
+  def test_returns_None_if_no_user_with_that_id(self):
+    user = User.objects.create(email='another@example.com')
+    result = AuthBackend().get_user(user.pk + 1)
     self.assertIsNone(result)
 
+  def test_second_lookup_is_served_from_cache(self):
+    user = User.objects.create(email='edith@example.com')
+    AuthBackend().get_user(user.pk)
+    with self.assertNumQueries(0):
+      user = AuthBackend().get_user(user.pk)
+    self.assertEqual(user.email, 'edith@example.com')
+    self.assertEqual((user_cache.hits, user_cache.misses), (1, 1))
+
+  def test_deleted_user_is_not_served_from_cache(self):
+    user = User.objects.create(email='edith@example.com')
+    user_id = user.pk
+    AuthBackend().get_user(user_id)
+    user.delete()
+    self.assertIsNone(AuthBackend().get_user(user_id))
+
+  def test_missing_users_are_not_cached(self):
+    AuthBackend().get_user(1)
+    User.objects.create(id=1, email='edith@example.com')
+    self.assertIsNotNone(AuthBackend().get_user(1))
+
+  async def test_async_get_user_shares_the_cache(self):
+    user = await User.objects.acreate(email='edith@example.com')
+    await AuthBackend().aget_user(user.pk)
+    user = await sync_to_async(AuthBackend().get_user)(user.pk)
+    self.assertEqual(user.email, 'edith@example.com')
+    self.assertEqual((user_cache.hits, user_cache.misses), (1, 1))
+
+  def test_returns_None_for_an_email_id_from_an_old_session(self):
+    User.objects.create(email='edith@example.com')
+    self.assertIsNone(AuthBackend().get_user('edith@example.com'))
+
+  async def test_async_returns_None_for_an_email_id_from_an_old_session(self):
+    await User.objects.acreate(email='edith@example.com')
+    self.assertIsNone(await AuthBackend().aget_user('edith@example.com'))
+
+
+class UserCacheTest(TestCase):
 
+  def test_evicts_least_recently_used_user(self):
+    cache = UserCache(maxsize=2, ttl=60)
+    cache.set('a', 'user a')
+    cache.set('b', 'user b')
+    cache.get('a')
+    cache.set('c', 'user c')
+    self.assertEqual(cache.get('a'), 'user a')
+    self.assertIsNone(cache.get('b'))
 
+  @mock.patch('accounts.authentication.time.monotonic')
+  def test_entries_expire_after_ttl(self, mock_monotonic):
+    cache = UserCache(maxsize=2, ttl=60)
+    mock_monotonic.return_value = 100
+    cache.set('a', 'user a')
+    mock_monotonic.return_value = 159
+    self.assertEqual(cache.get('a'), 'user a')
+    mock_monotonic.return_value = 160
+    self.assertIsNone(cache.get('a'))
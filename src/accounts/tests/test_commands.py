@@ -0,0 +1,31 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from accounts.models import Token, User
+
+class PurgeExpiredTokensTest(TestCase):
+
+  def test_deletes_only_expired_tokens(self):
+    expired = timezone.now() - timedelta(seconds=1)
+    for _ in range(3):
+      Token.objects.create(email='old@example.com', expires_at=expired)
+    valid = Token.objects.create(email='new@example.com')
+
+    out = StringIO()
+    call_command('purge_expired_tokens', batch_size=2, pause=0, stdout=out)
+
+    self.assertEqual(list(Token.objects.all()), [valid])
+    self.assertIn('Deleted 3 expired tokens', out.getvalue())
+
+
+class FlushTest(TransactionTestCase):
+
+  def test_flushed_database_does_not_reuse_user_ids(self):
+    old_user = User.objects.create(email='edith@example.com')
+    call_command('flush', interactive=False, verbosity=0)
+    new_user = User.objects.create(email='francis@example.com')
+    self.assertGreater(new_user.pk, old_user.pk)
@@ -1,6 +1,11 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import auth
 from django.core.exceptions import ValidationError
+from django.db.utils import IntegrityError
 from django.test import TestCase
+from django.utils import timezone
 
 from accounts.models import Token, User
 
@@ -16,9 +21,14 @@ class UserModelTest(TestCase):
     except ValidationError:
       self.fail('User not valid')
 
-  def test_email_is_primary_key(self):
-    user = User(email='name@example.com')
-    self.assertEqual(user.pk, 'name@example.com')
+  def test_gets_integer_id_on_save(self):
+    user = User.objects.create(email='name@example.com')
+    self.assertIsInstance(user.pk, int)
+
+  def test_email_is_unique(self):
+    User.objects.create(email='name@example.com')
+    with self.assertRaises(IntegrityError):
+      User.objects.create(email='name@example.com')
 
 
 class TokenModelTest(TestCase):
@@ -26,4 +36,17 @@ class TokenModelTest(TestCase):
   def test_links_user_with_auto_generated_uid(self):
     token1 = Token.objects.create(email='name@example.com')
     token2 = Token.objects.create(email='name@example.com')
-    self.assertNotEqual(token1.uid, token2.uid)
\ No newline at end of file
+    self.assertNotEqual(token1.uid, token2.uid)
+
+  def test_expires_after_max_age(self):
+    token = Token.objects.create(email='name@example.com')
+    self.assertAlmostEqual(
+      token.expires_at,
+      timezone.now() + settings.LOGIN_TOKEN_MAX_AGE,
+      delta=timedelta(seconds=5),
+    )
+
+  def test_uid_is_unique(self):
+    token = Token.objects.create(email='name@example.com')
+    with self.assertRaises(IntegrityError):
+      Token.objects.create(email='other@example.com', uid=token.uid)
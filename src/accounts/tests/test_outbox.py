@@ -0,0 +1,105 @@
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts import outbox
+from accounts.models import OutgoingEmail
+from accounts.outbox import queue_mail, retry_delay, send_queued_mail
+
+class SendQueuedMailTest(TestCase):
+
+  def queue(self, to_email='edith@example.com'):
+    return queue_mail('subject', 'body', 'noreply@flesmes.com', to_email)
+
+  def test_sends_and_removes_queued_emails(self):
+    self.queue()
+    sent, failed = send_queued_mail(mail.get_connection())
+    self.assertEqual((sent, failed), (1, 0))
+    self.assertEqual(mail.outbox[0].to, ['edith@example.com'])
+    self.assertEqual(mail.outbox[0].subject, 'subject')
+    self.assertFalse(OutgoingEmail.objects.exists())
+
+  def test_sends_at_most_batch_size_emails(self):
+    for n in range(3):
+      self.queue(f'user{n}@example.com')
+    send_queued_mail(mail.get_connection(), batch_size=2)
+    self.assertEqual(len(mail.outbox), 2)
+    self.assertEqual(OutgoingEmail.objects.count(), 1)
+
+  def test_reuses_one_connection_for_the_batch(self):
+    for n in range(3):
+      self.queue(f'user{n}@example.com')
+    connection = mock.Mock()
+    send_queued_mail(connection)
+    self.assertEqual(connection.send_messages.call_count, 3)
+    self.assertFalse(connection.close.called)
+
+  def test_failed_email_is_retried_later(self):
+    email = self.queue()
+    connection = mock.Mock()
+    connection.send_messages.side_effect = OSError('connection refused')
+
+    sent, failed = send_queued_mail(connection)
+
+    self.assertEqual((sent, failed), (0, 1))
+    email.refresh_from_db()
+    self.assertEqual(email.attempts, 1)
+    self.assertGreater(email.send_after, timezone.now())
+    self.assertIn('connection refused', email.last_error)
+    self.assertTrue(connection.close.called)
+
+  def test_retry_delay_backs_off_exponentially_up_to_a_limit(self):
+    self.assertEqual(retry_delay(2), 2 * retry_delay(1))
+    self.assertEqual(retry_delay(100), retry_delay(101))
+
+  def test_gives_up_after_max_attempts(self):
+    email = self.queue()
+    OutgoingEmail.objects.filter(id=email.id).update(attempts=5)
+    self.assertEqual(send_queued_mail(mail.get_connection()), (0, 0))
+    self.assertEqual(mail.outbox, [])
+
+  def test_command_drains_the_outbox(self):
+    for n in range(3):
+      self.queue(f'user{n}@example.com')
+    call_command(
+      'send_queued_mail', once=True, batch_size=2, stdout=StringIO()
+    )
+    self.assertEqual(len(mail.outbox), 3)
+    self.assertFalse(OutgoingEmail.objects.exists())
+
+  @mock.patch('superlists.db.time.sleep')
+  def test_sent_emails_are_removed_once_the_database_unlocks(self, _):
+    self.queue()
+    delete_sent = outbox._delete_sent
+    attempts = []
+
+    def locked_once(ids):
+      attempts.append(ids)
+      if len(attempts) == 1:
+        raise OperationalError('database is locked')
+      delete_sent(ids)
+
+    with mock.patch.object(outbox, '_delete_sent', locked_once):
+      self.assertEqual(send_queued_mail(mail.get_connection()), (1, 0))
+    self.assertEqual(len(attempts), 2)
+    self.assertFalse(OutgoingEmail.objects.exists())
+
+  @mock.patch('accounts.management.commands.send_queued_mail.time.sleep')
+  @mock.patch('accounts.management.commands.send_queued_mail.send_queued_mail')
+  def test_command_outlives_a_locked_database(self, mock_send, _):
+    mock_send.side_effect = [OperationalError('database is locked'), (1, 0)]
+    err = StringIO()
+    call_command('send_queued_mail', once=True, stdout=StringIO(), stderr=err)
+    self.assertEqual(mock_send.call_count, 2)
+    self.assertIn('database is locked', err.getvalue())
+
+  @mock.patch('accounts.management.commands.send_queued_mail.send_queued_mail')
+  def test_command_stops_on_other_database_errors(self, mock_send):
+    mock_send.side_effect = OperationalError('no such table')
+    with self.assertRaises(OperationalError):
+      call_command('send_queued_mail', once=True, stdout=StringIO())
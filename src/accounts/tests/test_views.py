@@ -1,10 +1,13 @@
 from unittest import mock
 
 from django.contrib import auth
-from django.test import TestCase
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.db import OperationalError
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
-from accounts.models import Token
+from accounts.models import OutgoingEmail, Token, User
 
 class SendLoginEmailViewTest(TestCase):
 
@@ -29,18 +32,23 @@ class SendLoginEmailViewTest(TestCase):
     )
     self.assertEqual(message.tags, 'success')
 
-  @mock.patch('accounts.views.send_mail')
-  def test_sends_mail_to_address_from_post(self, mock_send_mail):
+  def test_queues_mail_to_address_from_post(self):
     self.client.post(
       reverse('send_login_email'), 
       data={'email': 'edith@example.com'}
     )
 
-    self.assertTrue(mock_send_mail.called)
-    (subject, body, from_email, to_list), kwargs = mock_send_mail.call_args
-    self.assertEqual(subject, 'Your login link for Superlists')
-    self.assertEqual(from_email, 'noreply@flesmes.com')
-    self.assertEqual(to_list, ['edith@example.com'])
+    email = OutgoingEmail.objects.get()
+    self.assertEqual(email.subject, 'Your login link for Superlists')
+    self.assertEqual(email.from_email, 'noreply@flesmes.com')
+    self.assertEqual(email.to_email, 'edith@example.com')
+
+  def test_does_not_send_mail_during_the_request(self):
+    self.client.post(
+      reverse('send_login_email'), 
+      data={'email': 'edith@example.com'}
+    )
+    self.assertEqual(mail.outbox, [])
 
   def test_creates_token_associated_with_email(self):
     self.client.post(
@@ -50,16 +58,32 @@ class SendLoginEmailViewTest(TestCase):
     token = Token.objects.get()
     self.assertEqual(token.email, 'edith@example.com')
 
-  @mock.patch('accounts.views.send_mail')
-  def test_sends_link_to_login_using_token_uid(self, mock_send_mail):
+  def test_sends_link_to_login_using_token_uid(self):
     self.client.post(
       reverse('send_login_email'), 
       data={'email': 'edith@example.com'}
     )
     token = Token.objects.get()
     expected_url = f'http://testserver/accounts/login?token={token.uid}'
-    (_, body, _, _), _ = mock_send_mail.call_args
-    self.assertIn(expected_url, body)
+    self.assertIn(expected_url, OutgoingEmail.objects.get().body)
+
+  @mock.patch('accounts.views.queue_mail', side_effect=RuntimeError)
+  def test_no_token_is_left_when_queueing_the_mail_fails(self, _):
+    with self.assertRaises(RuntimeError):
+      self.client.post(
+        reverse('send_login_email'), data={'email': 'edith@example.com'}
+      )
+    self.assertFalse(Token.objects.exists())
+
+  @mock.patch('superlists.db.time.sleep')
+  def test_retries_while_database_is_locked(self, _):
+    locked = OperationalError('database is locked')
+    with mock.patch('accounts.views.queue_mail', side_effect=[locked, None]):
+      response = self.client.post(
+        reverse('send_login_email'), data={'email': 'edith@example.com'}
+      )
+    self.assertRedirects(response, reverse('home'))
+    self.assertEqual(Token.objects.count(), 1)
 
 class LoginViewTest(TestCase):
 
@@ -93,11 +117,37 @@ class LoginViewTest(TestCase):
     )
     self.assertEqual(message.tags, 'error')
 
-  @mock.patch('accounts.views.auth')
-  def test_calls_django_auth_authenticate(self, mock_auth):
+  @override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.signed_cookies'
+  )
+  def test_login_works_with_signed_cookie_sessions(self):
+    token = Token.objects.create(email='edith@example.com')
+    self.client.get(reverse('login', query={'token': token.uid}))
+
+    self.assertEqual(auth.get_user(self.client).email, 'edith@example.com')
+    self.assertFalse(Session.objects.exists())
+
+  @mock.patch('accounts.views.auth.aauthenticate')
+  def test_calls_django_auth_authenticate(self, mock_aauthenticate):
+    mock_aauthenticate.return_value = None
     self.client.get(reverse('login', query={'token': 'abcd123'}))
     self.assertEqual(
-      mock_auth.authenticate.call_args,
+      mock_aauthenticate.call_args,
       mock.call(uid='abcd123')
     )
 
+
+
+class LogoutViewTest(TestCase):
+
+  def test_logs_out_and_redirects_to_home_page(self):
+    self.client.force_login(User.objects.create(email='edith@example.com'))
+    response = self.client.post(reverse('logout'))
+    self.assertRedirects(response, reverse('home'))
+    self.assertFalse(auth.get_user(self.client).is_authenticated)
+
+  def test_only_accepts_POST(self):
+    self.client.force_login(User.objects.create(email='edith@example.com'))
+    response = self.client.get(reverse('logout'))
+    self.assertEqual(response.status_code, 405)
+    self.assertTrue(auth.get_user(self.client).is_authenticated)
@@ -1,29 +1,43 @@
 from django.contrib import auth, messages
-from django.core.mail import send_mail
 from django.shortcuts import redirect
 from django.urls import reverse
+from django.views.decorators.http import require_POST
 
 from accounts.models import Token
+from accounts.outbox import queue_mail
+from superlists.db import arun_write
 
-def send_login_email(request):
-  SUBJECT = 'Your login link for Superlists'
-  FROM_EMAIL = 'noreply@flesmes.com'
-  to_email = request.POST['email']
-  token = Token.objects.create(email=to_email)
-  relative_url = reverse('login', query={'token': str(token.uid)})
-  url = request.build_absolute_uri(relative_url)
-  body = f'Use this link to log in:\n\n{url}'
-  send_mail(SUBJECT, body, FROM_EMAIL, [to_email])
+LOGIN_EMAIL_SUBJECT = 'Your login link for Superlists'
+LOGIN_EMAIL_FROM = 'noreply@flesmes.com'
+
+async def send_login_email(request):
+  await arun_write(_queue_login_email, request, request.POST['email'])
   messages.success(
     request,
     'Check your email, we\'ve sent you a link you can use to log in.'
   )
   return redirect(reverse('home'))
 
-def login(request):
-  user = auth.authenticate(uid=request.GET['token'])
+# The token and its email are written together, so a token is never left
+# without the mail that carries it.
+def _queue_login_email(request, to_email):
+  token = Token.objects.create(email=to_email)
+  relative_url = reverse('login', query={'token': str(token.uid)})
+  url = request.build_absolute_uri(relative_url)
+  body = f'Use this link to log in:\n\n{url}'
+  queue_mail(LOGIN_EMAIL_SUBJECT, body, LOGIN_EMAIL_FROM, to_email)
+
+async def login(request):
+  user = await auth.aauthenticate(uid=request.GET['token'])
   if user:
-    auth.login(request, user)
+    await auth.alogin(request, user)
   else:
     messages.error(request,'Invalid login link, please request a new one')
   return redirect(reverse('home'))
+
+# Replaces auth's LogoutView, whose module pulls auth forms, generic views
+# and the sites framework into every worker.
+@require_POST
+async def logout(request):
+  await auth.alogout(request)
+  return redirect(reverse('home'))
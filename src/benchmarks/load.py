@@ -0,0 +1,357 @@
+"""
+Load test every superlists endpoint and keep JSON baselines of the results.
+
+Each client behaves like a user: it logs in by email link, starts a list,
+then loops over a weighted mix of home page loads, new lists, list views,
+item posts, "my lists" pages and fresh logins, keeping its cookies between
+requests. Latency percentiles, throughput and error rate are reported per
+endpoint.
+
+Run it against a local gunicorn started with the production settings and
+a fresh database, or against a server that is already running:
+
+    python -m benchmarks.load --server asgi --clients 8 --save asgi
+    python -m benchmarks.load --server asgi --clients 8 --compare asgi
+    python -m benchmarks.load --url http://localhost:8000 --db db.sqlite3
+
+Baselines are written to benchmarks/baselines/<name>.json. They only mean
+something on the machine that recorded them, so record one before a change
+and compare against it after. --compare exits with status 1 when an
+endpoint regressed beyond --tolerance.
+"""
+import argparse
+import http.client
+import http.cookies
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+from benchmarks.server_comparison import (
+  SERVERS,
+  SRC_DIR,
+  create_database,
+  server_env,
+  start_server,
+)
+
+BASELINES_DIR = os.path.join(os.path.dirname(__file__), 'baselines')
+
+MIX = {
+  'home': 20,
+  'new_list': 5,
+  'view_list': 45,
+  'add_item': 10,
+  'my_lists': 15,
+  'login': 5,
+}
+
+# Fewer requests than this make p95 too noisy to compare.
+MIN_SAMPLES = 100
+
+# How long after --seconds to wait for a client to report before giving up.
+RESULT_MARGIN = 60
+
+# Successful responses: pages render with 200 and forms redirect.
+EXPECTED_STATUS = {
+  'home': 200,
+  'new_list': 302,
+  'view_list': 200,
+  'add_item': 302,
+  'send_login_email': 302,
+  'login': 302,
+  'my_lists': 200,
+}
+
+
+class SQLiteTokens:
+  def __init__(self, path):
+    self.path = path
+
+  def __call__(self, email):
+    conn = sqlite3.connect(self.path, timeout=5)
+    try:
+      row = conn.execute(
+        'SELECT uid FROM accounts_token WHERE email = ? '
+        'ORDER BY expires_at DESC LIMIT 1',
+        (email,)
+      ).fetchone()
+    finally:
+      conn.close()
+    return row[0] if row else None
+
+
+class Session:
+  def __init__(self, base_url):
+    url = urllib.parse.urlsplit(base_url)
+    self.host = url.hostname
+    self.port = url.port
+    self.cookies = {}
+    self.conn = None
+
+  def request(self, method, path, data=None):
+    if self.conn is None:
+      self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+    headers = {}
+    if self.cookies:
+      headers['Cookie'] = '; '.join(
+        f'{name}={value}' for name, value in self.cookies.items()
+      )
+    body = None
+    if data is not None:
+      data = {**data, 'csrfmiddlewaretoken': self.cookies.get('csrftoken', '')}
+      body = urllib.parse.urlencode(data)
+      headers['Content-Type'] = 'application/x-www-form-urlencoded'
+    try:
+      self.conn.request(method, path, body, headers)
+      response = self.conn.getresponse()
+      response.read()
+    except (OSError, http.client.HTTPException):
+      self.conn.close()
+      self.conn = None
+      return None, None
+    for header in response.msg.get_all('Set-Cookie') or []:
+      cookie = http.cookies.SimpleCookie(header)
+      for name, morsel in cookie.items():
+        if morsel['max-age'] == '0':
+          self.cookies.pop(name, None)
+        else:
+          self.cookies[name] = morsel.value
+    return response.status, response.getheader('Location')
+
+
+class Client:
+  def __init__(self, base_url, client_id, token_for):
+    self.session = Session(base_url)
+    self.email = f'load-{client_id}-{os.getpid()}@example.com'
+    self.token_for = token_for
+    self.list_urls = []
+    self.n = 0
+    self.latencies = {name: [] for name in EXPECTED_STATUS}
+    self.errors = {name: 0 for name in EXPECTED_STATUS}
+
+  def timed(self, name, method, path, data=None):
+    start = time.perf_counter()
+    status, location = self.session.request(method, path, data)
+    self.latencies[name].append(time.perf_counter() - start)
+    if status != EXPECTED_STATUS[name]:
+      self.errors[name] += 1
+      return None
+    return location
+
+  def item_text(self):
+    self.n += 1
+    return f'item {self.n}'
+
+  def home(self):
+    self.timed('home', 'GET', '/')
+
+  def new_list(self):
+    location = self.timed(
+      'new_list', 'POST', '/lists/new', {'text': self.item_text()}
+    )
+    if location:
+      self.list_urls.append(urllib.parse.urlsplit(location).path)
+
+  def view_list(self):
+    if not self.list_urls:
+      return self.new_list()
+    self.timed('view_list', 'GET', random.choice(self.list_urls))
+
+  def add_item(self):
+    if not self.list_urls:
+      return self.new_list()
+    url = random.choice(self.list_urls)
+    self.timed('add_item', 'POST', url, {'text': self.item_text()})
+
+  def my_lists(self):
+    self.timed('my_lists', 'GET', f'/lists/users/{self.email}/')
+
+  def login(self):
+    if self.token_for is None:
+      return
+    sent = self.timed(
+      'send_login_email', 'POST', '/accounts/send_login_email',
+      {'email': self.email},
+    )
+    uid = self.token_for(self.email) if sent else None
+    if uid:
+      query = urllib.parse.urlencode({'token': uid})
+      self.timed('login', 'GET', f'/accounts/login?{query}')
+
+  def run(self, seconds):
+    self.home()
+    self.login()
+    self.new_list()
+    names = list(MIX)
+    weights = [MIX[name] for name in names]
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+      getattr(self, random.choices(names, weights)[0])()
+
+
+def client(base_url, seconds, client_id, token_for, results):
+  c = Client(base_url, client_id, token_for)
+  # Reports back even if the client crashed, so run() isn't left waiting.
+  try:
+    c.run(seconds)
+  finally:
+    results.put((c.latencies, c.errors))
+
+def percentile(latencies, p):
+  if not latencies:
+    return 0
+  index = min(int(len(latencies) * p), len(latencies) - 1)
+  return round(latencies[index] * 1000, 2)
+
+def run(base_url, clients=4, seconds=10, token_for=None, threads=False):
+  worker = threading.Thread if threads else multiprocessing.Process
+  results = multiprocessing.Queue()
+  workers = [
+    worker(target=client, args=(base_url, seconds, n, token_for, results))
+    for n in range(clients)
+  ]
+  start = time.perf_counter()
+  for w in workers:
+    w.start()
+  # A worker that died without reporting fails the run instead of hanging it.
+  totals = [results.get(timeout=seconds + RESULT_MARGIN) for _ in workers]
+  for w in workers:
+    w.join()
+  elapsed = time.perf_counter() - start
+
+  endpoints = {}
+  for name in EXPECTED_STATUS:
+    latencies = sorted(l for t in totals for l in t[0][name])
+    errors = sum(t[1][name] for t in totals)
+    if not latencies:
+      continue
+    endpoints[name] = {
+      'requests': len(latencies),
+      'errors': errors,
+      'error_rate': round(errors / len(latencies), 4),
+      'throughput': round(len(latencies) / elapsed, 2),
+      'p50_ms': percentile(latencies, 0.50),
+      'p95_ms': percentile(latencies, 0.95),
+      'p99_ms': percentile(latencies, 0.99),
+    }
+  return endpoints
+
+def git_commit():
+  try:
+    return subprocess.run(
+      ['git', 'rev-parse', '--short', 'HEAD'],
+      cwd=SRC_DIR, capture_output=True, text=True, check=True,
+    ).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def compare(baseline, endpoints, tolerance):
+  regressions = []
+  for name, current in endpoints.items():
+    before = baseline['endpoints'].get(name)
+    if before is None:
+      continue
+    enough = min(current['requests'], before['requests']) >= MIN_SAMPLES
+    if enough and current['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+      regressions.append(
+        f'{name}: p95 {before["p95_ms"]}ms -> {current["p95_ms"]}ms'
+      )
+    if current['throughput'] < before['throughput'] * (1 - tolerance):
+      regressions.append(
+        f'{name}: throughput {before["throughput"]}/s '
+        f'-> {current["throughput"]}/s'
+      )
+    if current['error_rate'] > before['error_rate'] + 0.01:
+      regressions.append(
+        f'{name}: error rate {before["error_rate"]:.2%} '
+        f'-> {current["error_rate"]:.2%}'
+      )
+  return regressions
+
+def print_report(endpoints):
+  print(f'{"endpoint":<18}{"requests":>9}{"req/s":>9}{"errors":>8}'
+        f'{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}')
+  for name, r in endpoints.items():
+    print(f'{name:<18}{r["requests"]:>9}{r["throughput"]:>9.1f}'
+          f'{r["error_rate"]:>8.1%}{r["p50_ms"]:>9.1f}{r["p95_ms"]:>9.1f}'
+          f'{r["p99_ms"]:>9.1f}')
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  target = parser.add_mutually_exclusive_group(required=True)
+  target.add_argument('--server', choices=SERVERS)
+  target.add_argument('--url')
+  parser.add_argument('--db', help='database of --url, to read login tokens')
+  parser.add_argument('--workers', type=int, default=2)
+  parser.add_argument('--clients', type=int, default=8)
+  parser.add_argument('--seconds', type=float, default=10)
+  parser.add_argument('--port', type=int, default=8899)
+  parser.add_argument('--save', metavar='NAME')
+  parser.add_argument('--compare', metavar='NAME')
+  parser.add_argument('--tolerance', type=float, default=0.2)
+  args = parser.parse_args()
+
+  with tempfile.TemporaryDirectory() as tmp:
+    server = None
+    if args.server:
+      env = server_env(tmp)
+      create_database(env)
+      server = start_server(args.server, env, args.port, args.workers)
+      base_url = f'http://localhost:{args.port}'
+      token_for = SQLiteTokens(env['DJANGO_DB_PATH'])
+    else:
+      base_url = args.url
+      token_for = SQLiteTokens(args.db) if args.db else None
+    try:
+      endpoints = run(base_url, args.clients, args.seconds, token_for)
+    finally:
+      if server:
+        server.terminate()
+        server.wait()
+
+  print(f'{args.server or base_url}, {args.clients} clients, '
+        f'{args.seconds:g}s')
+  print_report(endpoints)
+  result = {
+    'commit': git_commit(),
+    'recorded': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    'machine': f'{platform.machine()} {os.cpu_count()} cpu, '
+               f'Python {platform.python_version()}',
+    'target': args.server or base_url,
+    'workers': args.workers if args.server else None,
+    'clients': args.clients,
+    'seconds': args.seconds,
+    'endpoints': endpoints,
+  }
+
+  if args.save:
+    os.makedirs(BASELINES_DIR, exist_ok=True)
+    path = os.path.join(BASELINES_DIR, f'{args.save}.json')
+    with open(path, 'w') as f:
+      json.dump(result, f, indent=2)
+      f.write('\n')
+    print(f'Saved baseline to {path}')
+
+  if args.compare:
+    path = os.path.join(BASELINES_DIR, f'{args.compare}.json')
+    with open(path) as f:
+      baseline = json.load(f)
+    regressions = compare(baseline, endpoints, args.tolerance)
+    print(f'Compared with {path} (commit {baseline["commit"]})')
+    for regression in regressions:
+      print(f'  REGRESSION {regression}')
+    if regressions:
+      sys.exit(1)
+    print('  no regressions')
+
+if __name__ == '__main__':
+  main()
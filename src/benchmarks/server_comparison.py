@@ -0,0 +1,224 @@
+"""
+Compare throughput and latency of the site under sync gunicorn workers
+(WSGI) and uvicorn workers (ASGI), with the production settings.
+
+Each server gets a fresh database seeded with lists. Client processes
+then hammer it over keep-alive connections: most requests view a list,
+some load the home page and the rest add an item to a list. With
+--lock-ms, another process keeps taking the SQLite write lock for that
+long, the way a slow writer would, so requests have to wait for it.
+
+    python -m benchmarks.server_comparison --workers 2 --clients 16
+
+The servers inherit the environment, so e.g. DJANGO_WRITE_COALESCING=1
+compares them with group commit on.
+"""
+import argparse
+import hashlib
+import http.client
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+
+SERVERS = {
+  'wsgi': ['superlists.wsgi:application'],
+  'asgi': [
+    '--worker-class', 'uvicorn_worker.UvicornWorker',
+    'superlists.asgi:application',
+  ],
+}
+
+HOST = 'localhost'
+N_LISTS = 50
+N_ITEMS = 20
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def server_env(data_dir):
+  return {
+    **os.environ,
+    'DJANGO_DEBUG_FALSE': 'Yes',
+    'DJANGO_SECRET_KEY': 'benchmark',
+    'DJANGO_ALLOWED_HOST': HOST,
+    'DJANGO_DB_PATH': os.path.join(data_dir, 'db.sqlite3'),
+  }
+
+# lists.models.item_text_hash, without setting up Django.
+def text_hash(text):
+  return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+def create_database(env):
+  subprocess.run(
+    [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+    cwd=SRC_DIR, env=env, check=True,
+  )
+  conn = sqlite3.connect(env['DJANGO_DB_PATH'])
+  conn.executemany(
+    'INSERT INTO lists_list (id, name, item_count, modified, version) '
+    "VALUES (?, 'item 0', ?, datetime('now'), ?)",
+    [(n, N_ITEMS, N_ITEMS) for n in range(1, N_LISTS + 1)]
+  )
+  conn.executemany(
+    'INSERT INTO lists_item (list_id, text, text_hash) VALUES (?, ?, ?)',
+    [
+      (n, f'item {i}', text_hash(f'item {i}'))
+      for n in range(1, N_LISTS + 1)
+      for i in range(N_ITEMS)
+    ]
+  )
+  conn.commit()
+  conn.close()
+
+def start_server(name, env, port, workers):
+  process = subprocess.Popen(
+    [
+      sys.executable, '-m', 'gunicorn',
+      '--bind', f'127.0.0.1:{port}',
+      '--workers', str(workers),
+      '--log-level', 'warning',
+      *SERVERS[name],
+    ],
+    cwd=SRC_DIR, env=env,
+  )
+  deadline = time.monotonic() + 20
+  while time.monotonic() < deadline:
+    try:
+      conn = http.client.HTTPConnection(HOST, port, timeout=1)
+      conn.request('GET', '/')
+      conn.getresponse().read()
+      conn.close()
+      return process
+    except OSError:
+      time.sleep(0.1)
+  process.terminate()
+  raise RuntimeError(f'{name} server did not start')
+
+def hold_write_lock(path, lock_ms, stop):
+  conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+  while not stop.is_set():
+    conn.execute('BEGIN IMMEDIATE')
+    time.sleep(lock_ms / 1000)
+    conn.execute('COMMIT')
+    time.sleep(lock_ms / 1000)
+
+def client(port, seconds, write_ratio, client_id, results):
+  conn = http.client.HTTPConnection(HOST, port, timeout=30)
+  conn.request('GET', '/')
+  response = conn.getresponse()
+  response.read()
+  cookie = response.getheader('Set-Cookie', '')
+  csrf_token = cookie.split('csrftoken=', 1)[1].split(';', 1)[0]
+  headers = {'Cookie': f'csrftoken={csrf_token}'}
+  post_headers = {
+    **headers, 'Content-Type': 'application/x-www-form-urlencoded',
+  }
+
+  counts = {'reads': 0, 'writes': 0, 'errors': 0}
+  latencies = []
+  deadline = time.monotonic() + seconds
+  n = 0
+  while time.monotonic() < deadline:
+    n += 1
+    list_url = f'/lists/{random.randint(1, N_LISTS)}/'
+    roll = random.random()
+    start = time.perf_counter()
+    if roll < write_ratio:
+      kind = 'writes'
+      body = urllib.parse.urlencode({
+        'text': f'item {client_id}-{n}',
+        'csrfmiddlewaretoken': csrf_token,
+      })
+      conn.request('POST', list_url, body, post_headers)
+      expected = 302
+    else:
+      kind = 'reads'
+      url = '/' if roll < write_ratio + 0.2 else list_url
+      conn.request('GET', url, headers=headers)
+      expected = 200
+    try:
+      response = conn.getresponse()
+      response.read()
+      ok = response.status == expected
+    except (OSError, http.client.HTTPException):
+      conn.close()
+      conn = http.client.HTTPConnection(HOST, port, timeout=30)
+      ok = False
+    latencies.append(time.perf_counter() - start)
+    counts[kind if ok else 'errors'] += 1
+  results.put((counts, latencies))
+
+def run(name, workers, clients, seconds, write_ratio, lock_ms, port):
+  with tempfile.TemporaryDirectory() as tmp:
+    env = server_env(tmp)
+    create_database(env)
+    server = start_server(name, env, port, workers)
+    stop = multiprocessing.Event()
+    locker = None
+    if lock_ms:
+      locker = multiprocessing.Process(
+        target=hold_write_lock, args=(env['DJANGO_DB_PATH'], lock_ms, stop)
+      )
+      locker.start()
+    try:
+      results = multiprocessing.Queue()
+      processes = [
+        multiprocessing.Process(
+          target=client, args=(port, seconds, write_ratio, n, results)
+        )
+        for n in range(clients)
+      ]
+      for process in processes:
+        process.start()
+      totals = [results.get() for _ in processes]
+      for process in processes:
+        process.join()
+    finally:
+      stop.set()
+      if locker:
+        locker.join()
+      server.terminate()
+      server.wait()
+  reads = sum(t[0]['reads'] for t in totals)
+  writes = sum(t[0]['writes'] for t in totals)
+  errors = sum(t[0]['errors'] for t in totals)
+  latencies = sorted(l for t in totals for l in t[1])
+  def percentile(p):
+    return latencies[int(len(latencies) * p)] * 1000 if latencies else 0
+  return {
+    'server': name,
+    'req/s': (reads + writes) / seconds,
+    'writes/s': writes / seconds,
+    'errors': errors,
+    'p50 ms': percentile(0.5),
+    'p99 ms': percentile(0.99),
+  }
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--workers', type=int, default=2)
+  parser.add_argument('--clients', type=int, default=16)
+  parser.add_argument('--seconds', type=float, default=5)
+  parser.add_argument('--write-ratio', type=float, default=0.1)
+  parser.add_argument('--lock-ms', type=float, default=0)
+  parser.add_argument('--port', type=int, default=8899)
+  args = parser.parse_args()
+
+  print(f'{args.workers} workers, {args.clients} clients, {args.seconds}s, '
+        f'{args.write_ratio:.0%} writes, {args.lock_ms:g}ms lock holder')
+  print(f'{"server":<8}{"req/s":>9}{"writes/s":>10}{"errors":>8}'
+        f'{"p50 ms":>9}{"p99 ms":>9}')
+  for name in SERVERS:
+    r = run(
+      name, args.workers, args.clients, args.seconds,
+      args.write_ratio, args.lock_ms, args.port,
+    )
+    print(f'{r["server"]:<8}{r["req/s"]:>9.0f}{r["writes/s"]:>10.0f}'
+          f'{r["errors"]:>8}{r["p50 ms"]:>9.1f}{r["p99 ms"]:>9.1f}')
+
+if __name__ == '__main__':
+  main()
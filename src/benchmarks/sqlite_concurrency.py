@@ -0,0 +1,160 @@
+"""
+Compare SQLite throughput and lock errors under concurrent load for the
+default connection settings and the production profile in settings.py.
+
+Each worker process sets up Django and makes requests through the models
+on a migrated database: most read a list, the rest add an item through
+ExistingListItemForm in a retrying_transaction, the way view_list does.
+
+    python -m benchmarks.sqlite_concurrency --workers 8 --seconds 5
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import django
+
+N_LISTS = 100
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 'production' is DATABASES and the read router exactly as settings.py
+# sets them up with DEBUG off; 'default' swaps in Django's own SQLite
+# settings, with one connection per request.
+PROFILES = ['default', 'production']
+
+def django_env(path):
+  return {
+    **os.environ,
+    'DJANGO_SETTINGS_MODULE': 'superlists.settings',
+    'DJANGO_DEBUG_FALSE': 'Yes',
+    'DJANGO_SECRET_KEY': 'benchmark',
+    'DJANGO_ALLOWED_HOST': 'localhost',
+    'DJANGO_DB_PATH': path,
+  }
+
+def create_database(path, profile_name):
+  env = django_env(path)
+  subprocess.run(
+    [sys.executable, 'manage.py', 'migrate', '--verbosity', '0'],
+    cwd=SRC_DIR, env=env, check=True,
+  )
+  subprocess.run(
+    [
+      sys.executable, 'manage.py', 'shell', '--verbosity', '0', '--command',
+      'from lists.models import List; '
+      f'List.objects.bulk_create(List() for _ in range({N_LISTS}))',
+    ],
+    cwd=SRC_DIR, env=env, check=True,
+  )
+  if profile_name == 'default':
+    # Migrating with the production settings left the file in WAL mode.
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    conn.close()
+
+# Runs in each worker process, before anything touches the database.
+def setup_django(path, profile_name):
+  os.environ.update(django_env(path))
+  django.setup()
+  from django.conf import settings
+  if profile_name == 'default':
+    settings.DATABASES = {
+      'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': path},
+    }
+    settings.DATABASE_ROUTERS = []
+
+def read_list(list_id):
+  from lists.models import Item
+  list(Item.objects.filter(list_id=list_id).order_by('id')[:100])
+
+# What view_list does with a new item.
+def add_item(list_id, text):
+  from lists.forms import ExistingListItemForm
+  from lists.models import List
+  from superlists.db import retrying_transaction
+
+  current_list = List.objects.get(id=list_id)
+  form = ExistingListItemForm(for_list=current_list, data={'text': text})
+  retrying_transaction(lambda: form.is_valid() and form.save())()
+
+def worker(path, profile_name, seconds, write_ratio, worker_id, results):
+  setup_django(path, profile_name)
+  from django.db import OperationalError, close_old_connections
+
+  reads = writes = errors = 0
+  latencies = []
+  deadline = time.monotonic() + seconds
+  n = 0
+  while time.monotonic() < deadline:
+    n += 1
+    list_id = random.randint(1, N_LISTS)
+    start = time.perf_counter()
+    try:
+      if random.random() < write_ratio:
+        add_item(list_id, f'item {worker_id}-{n}')
+        writes += 1
+      else:
+        read_list(list_id)
+        reads += 1
+    except OperationalError:
+      errors += 1
+    finally:
+      # The end of a request: closes connections past CONN_MAX_AGE.
+      close_old_connections()
+    latencies.append(time.perf_counter() - start)
+  results.put((reads, writes, errors, latencies))
+
+def run(profile_name, workers, seconds, write_ratio):
+  with tempfile.TemporaryDirectory() as tmp:
+    path = os.path.join(tmp, 'db.sqlite3')
+    create_database(path, profile_name)
+    results = multiprocessing.Queue()
+    processes = [
+      multiprocessing.Process(
+        target=worker,
+        args=(path, profile_name, seconds, write_ratio, n, results),
+      )
+      for n in range(workers)
+    ]
+    for process in processes:
+      process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+      process.join()
+  reads = sum(t[0] for t in totals)
+  writes = sum(t[1] for t in totals)
+  errors = sum(t[2] for t in totals)
+  latencies = sorted(l for t in totals for l in t[3])
+  p99 = latencies[int(len(latencies) * 0.99)] if latencies else 0
+  return {
+    'profile': profile_name,
+    'reads/s': reads / seconds,
+    'writes/s': writes / seconds,
+    'errors': errors,
+    'p99 ms': p99 * 1000,
+  }
+
+def main():
+  parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+  parser.add_argument('--workers', type=int, default=8)
+  parser.add_argument('--seconds', type=float, default=5)
+  parser.add_argument('--write-ratio', type=float, default=0.2)
+  args = parser.parse_args()
+
+  print(f'{args.workers} workers, {args.seconds}s, '
+        f'{args.write_ratio:.0%} writes')
+  print(f'{"profile":<12}{"reads/s":>10}{"writes/s":>10}'
+        f'{"errors":>8}{"p99 ms":>9}')
+  for profile_name in PROFILES:
+    r = run(profile_name, args.workers, args.seconds, args.write_ratio)
+    print(f'{r["profile"]:<12}{r["reads/s"]:>10.0f}{r["writes/s"]:>10.0f}'
+          f'{r["errors"]:>8}{r["p99 ms"]:>9.1f}')
+
+if __name__ == '__main__':
+  main()
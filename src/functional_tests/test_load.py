@@ -0,0 +1,24 @@
+from django.test import LiveServerTestCase
+
+from accounts.models import Token
+from benchmarks import load
+from lists.models import List
+
+def latest_token(email):
+  token = Token.objects.filter(email=email).order_by('-expires_at').first()
+  return token.uid if token else None
+
+class LoadTest(LiveServerTestCase):
+
+  # The live server shares the test's in-memory SQLite connection between
+  # its threads, so concurrent requests would interleave transactions on
+  # it. One client keeps requests one at a time.
+  def test_every_endpoint_serves_a_short_load_without_errors(self):
+    endpoints = load.run(
+      self.live_server_url, clients=1, seconds=2,
+      token_for=latest_token, threads=True,
+    )
+    self.assertEqual(set(endpoints), set(load.EXPECTED_STATUS))
+    for name, result in endpoints.items():
+      self.assertEqual(result['errors'], 0, name)
+    self.assertTrue(List.objects.filter(owner__isnull=False).exists())
@@ -1,6 +1,7 @@
 import re
 
 from django.core import mail
+from django.core.management import call_command
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 
@@ -33,6 +34,9 @@ class LoginTest(FunctionalTest):
     if self.test_server:
       return
 
+    # The mail worker picks up the queued email and sends it
+    call_command('send_queued_mail', once=True)
+
     # She checks her email and finds a message
     email = mail.outbox.pop()
     self.assertIn(TEST_EMAIL, email.to)
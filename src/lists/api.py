@@ -0,0 +1,139 @@
+import json
+
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from accounts.models import User
+from lists.forms import ExistingListItemForm, ItemForm
+from lists.models import List
+from lists.views import list_cursor, parse_cursor, parse_list_cursor
+from superlists.db import write_transaction
+
+JSON_REQUIRED_ERROR = 'Requests must have a JSON body'
+
+# Writes are only accepted with a JSON content type, which browsers will
+# not send cross-site without a CORS preflight, so the API does not need
+# CSRF tokens.
+
+def list_etag(current_list):
+  return f'"{current_list.id}-{current_list.version}"'
+
+def list_data(current_list):
+  return {
+    'id': current_list.id,
+    'name': current_list.name,
+    'item_count': current_list.item_count,
+    'version': current_list.version,
+    'modified': current_list.modified.isoformat(),
+    'owner': current_list.owner and current_list.owner.email,
+    'url': reverse('api_list', args=[current_list.id]),
+    'html_url': current_list.get_absolute_url(),
+  }
+
+def item_data(item):
+  return {'id': item.id, 'text': item.text}
+
+def _json_body(request):
+  if request.content_type != 'application/json':
+    return None
+  try:
+    data = json.loads(request.body)
+  except ValueError:
+    return None
+  return data if isinstance(data, dict) else None
+
+def _bad_request(errors, status=400):
+  return JsonResponse({'errors': errors}, status=status)
+
+def _list_response(current_list, status=200):
+  response = JsonResponse(list_data(current_list), status=status)
+  response['ETag'] = list_etag(current_list)
+  return response
+
+@csrf_exempt
+@require_http_methods(['POST'])
+@write_transaction
+def new_list(request):
+  data = _json_body(request)
+  if data is None:
+    return _bad_request([JSON_REQUIRED_ERROR], status=415)
+  form = ItemForm(data=data)
+  if not form.is_valid():
+    return _bad_request(form.errors['text'])
+  new_list = List.objects.create()
+  if request.user.is_authenticated:
+    new_list.owner = request.user
+    new_list.save()
+  form.save(for_list=new_list)
+  return _list_response(new_list, status=201)
+
+@require_http_methods(['GET', 'HEAD'])
+def view_list(request, list_id):
+  current_list = get_object_or_404(
+    List.objects.select_related('owner'), id=list_id
+  )
+  not_modified = get_conditional_response(
+    request, etag=list_etag(current_list)
+  )
+  if not_modified:
+    return not_modified
+  return _list_response(current_list)
+
+@csrf_exempt
+@require_http_methods(['GET', 'HEAD', 'POST'])
+@write_transaction
+def list_items(request, list_id):
+  current_list = get_object_or_404(
+    List.objects.select_related('owner'), id=list_id
+  )
+  if request.method == 'POST':
+    return _add_item(request, current_list)
+
+  after = parse_cursor(request.GET.get('after'))
+  etag = f'"{current_list.id}-{current_list.version}-{after}"'
+  not_modified = get_conditional_response(request, etag=etag)
+  if not_modified:
+    return not_modified
+  items, next_cursor = current_list.item_page(after, settings.LIST_PAGE_SIZE)
+  response = JsonResponse({
+    'list': list_data(current_list),
+    'items': [item_data(item) for item in items],
+    'next': next_cursor,
+  })
+  response['ETag'] = etag
+  return response
+
+def _add_item(request, current_list):
+  data = _json_body(request)
+  if data is None:
+    return _bad_request([JSON_REQUIRED_ERROR], status=415)
+  form = ExistingListItemForm(for_list=current_list, data=data)
+  item = form.is_valid() and form.save()
+  if not item:
+    return _bad_request(form.errors['text'])
+  response = JsonResponse(item_data(item), status=201)
+  response['ETag'] = list_etag(current_list)
+  return response
+
+@require_http_methods(['GET', 'HEAD'])
+def user_lists(request, email):
+  try:
+    owner = User.objects.get(email=email)
+  except User.DoesNotExist:
+    raise Http404('No such user')
+  lists, last = List.owner_page(
+    owner,
+    parse_list_cursor(request.GET.get('before')),
+    settings.MY_LISTS_PAGE_SIZE,
+  )
+  for list_ in lists:
+    list_.owner = owner
+  return JsonResponse({
+    'lists': [list_data(list_) for list_ in lists],
+    'next': list_cursor(last) if last else None,
+  })
@@ -0,0 +1,9 @@
+from django.urls import path
+from lists import api
+
+urlpatterns = [
+    path('lists/', api.new_list, name='api_new_list'),
+    path('lists/<int:list_id>/', api.view_list, name='api_list'),
+    path('lists/<int:list_id>/items/', api.list_items, name='api_list_items'),
+    path('users/<str:email>/lists/', api.user_lists, name='api_user_lists'),
+]
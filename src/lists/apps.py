@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ListsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'lists'
+
+    def ready(self):
+        import lists.autocomplete  # connects signal handlers
+        import lists.live
@@ -0,0 +1,89 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Count
+from django.dispatch import receiver
+
+from lists.models import Item
+from lists.signals import items_added
+
+class PrefixIndex:
+  def __init__(self, counts):
+    entries = sorted(
+      (text.casefold(), text, count) for text, count in counts.items()
+    )
+    self._keys = [key for key, _, _ in entries]
+    self._texts = [text for _, text, _ in entries]
+    self._counts = [count for _, _, count in entries]
+
+  def __len__(self):
+    return len(self._keys)
+
+  def complete(self, prefix, limit):
+    key = prefix.casefold()
+    start = bisect_left(self._keys, key)
+    end = bisect_left(self._keys, key + '\U0010ffff', lo=start)
+    best = heapq.nlargest(
+      limit, range(start, end), key=lambda n: self._counts[n]
+    )
+    return [self._texts[n] for n in best]
+
+
+class PrefixIndexCache:
+  def __init__(self, maxsize, ttl):
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self._indexes = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, user_id):
+    with self._lock:
+      entry = self._indexes.get(user_id)
+      if entry is not None and entry[1] > time.monotonic():
+        self._indexes.move_to_end(user_id)
+        return entry[0]
+    index = build_index(user_id)
+    with self._lock:
+      self._indexes[user_id] = (index, time.monotonic() + self.ttl)
+      self._indexes.move_to_end(user_id)
+      while len(self._indexes) > self.maxsize:
+        self._indexes.popitem(last=False)
+    return index
+
+  def invalidate(self, user_id):
+    with self._lock:
+      self._indexes.pop(user_id, None)
+
+  def clear(self):
+    with self._lock:
+      self._indexes.clear()
+
+
+def build_index(user_id):
+  counts = (
+    Item.objects.filter(list__owner_id=user_id)
+    .order_by()
+    .values_list('text')
+    .annotate(uses=Count('id'))
+  )
+  return PrefixIndex(dict(counts))
+
+
+indexes = PrefixIndexCache(
+  maxsize=settings.AUTOCOMPLETE_CACHE_SIZE,
+  ttl=settings.AUTOCOMPLETE_CACHE_TTL,
+)
+
+@receiver(items_added)
+def invalidate_owner_index(sender, list, items, **kwargs):
+  if list.owner_id is not None:
+    indexes.invalidate(list.owner_id)
+
+def suggest(user, prefix, limit):
+  if not prefix.strip():
+    return []
+  return indexes.get(user.pk).complete(prefix.strip(), limit)
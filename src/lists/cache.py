@@ -0,0 +1,63 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+
+class CacheStats:
+  def __init__(self):
+    self.hits = 0
+    self.misses = 0
+    self._lock = threading.Lock()
+
+  def record(self, hit):
+    with self._lock:
+      if hit:
+        self.hits += 1
+      else:
+        self.misses += 1
+
+  @property
+  def hit_rate(self):
+    total = self.hits + self.misses
+    return self.hits / total if total else 0.0
+
+  def reset(self):
+    with self._lock:
+      self.hits = 0
+      self.misses = 0
+
+
+stats = CacheStats()
+
+def item_rows_key(current_list, after):
+  # The version changes whenever items are added, so there is nothing to
+  # delete on writes: stale entries are simply never read again. The
+  # modified time guards against ids being reused after a database flush.
+  return (
+    f'list-rows:{current_list.id}:{current_list.version}'
+    f':{current_list.modified.timestamp()}'
+    f':{after}:{settings.LIST_PAGE_SIZE}'
+  )
+
+def render_item_page(current_list, after):
+  cache = caches[settings.LIST_CACHE_ALIAS]
+  key = item_rows_key(current_list, after)
+  page = cache.get(key)
+  stats.record(hit=page is not None)
+  if page is None:
+    items, next_cursor = current_list.item_page(
+      after, settings.LIST_PAGE_SIZE
+    )
+    offset = 0
+    if after:
+      offset = current_list.item_set.filter(id__lte=after).count()
+    page = {
+      'item_rows': render_to_string(
+        'includes/item_rows.html', {'items': items, 'offset': offset}
+      ),
+      'next_cursor': next_cursor,
+      'last_item': items[-1].id if items else after,
+    }
+    cache.set(key, page)
+  return page
@@ -1,9 +1,19 @@
+import json
+
 from django import forms
+from django.db import transaction
 
-from lists.models import Item
+from lists.models import Item, item_text_hash
+from superlists import metrics
 
 DUPLICATE_ITEM_ERROR = 'You\'ve already got this in your list'
 EMPTY_ITEM_ERROR = "You can't have an empty list item"
+EMPTY_IMPORT_ERROR = 'Paste at least one item to import'
+INVALID_IMPORT_ERROR = 'Items must be one per line or a JSON list of strings'
+TOO_MANY_ITEMS_ERROR = 'You can import at most {max} items at once'
+
+MAX_IMPORT_ITEMS = 500
+IMPORT_BATCH_SIZE = 100
 
 class ItemForm(forms.Form):
   text = forms.CharField(
@@ -23,11 +33,76 @@ class ExistingListItemForm(ItemForm):
     super().__init__(*args, **kwargs)
     self._for_list = for_list
 
-  def clean_text(self):
-    text = self.cleaned_data['text']
-    if self._for_list.item_set.filter(text=text).exists():
-      raise forms.ValidationError(DUPLICATE_ITEM_ERROR)
-    return text
-  
   def save(self):
-    return super().save(for_list=self._for_list)
\ No newline at end of file
+    # The (list, text_hash) unique constraint detects duplicates, so there
+    # is no separate query to check for them before inserting.
+    item = Item.objects.create_unless_duplicate(
+      self._for_list, self.cleaned_data['text']
+    )
+    if item is None:
+      metrics.inc_on_commit('superlists_duplicate_items_total')
+      self.add_error('text', DUPLICATE_ITEM_ERROR)
+    return item
+
+
+class BulkItemForm(forms.Form):
+  items = forms.CharField(
+    required=True,
+    strip=False,
+    widget=forms.Textarea,
+    error_messages={'required': EMPTY_IMPORT_ERROR},
+  )
+
+  def clean_items(self):
+    raw = self.cleaned_data['items']
+    if raw.lstrip().startswith(('[', '{')):
+      texts = self._parse_json(raw)
+    else:
+      texts = raw.splitlines()
+    texts = [text.strip() for text in texts if text.strip()]
+    if not texts:
+      raise forms.ValidationError(EMPTY_IMPORT_ERROR)
+    if len(texts) > MAX_IMPORT_ITEMS:
+      raise forms.ValidationError(
+        TOO_MANY_ITEMS_ERROR.format(max=MAX_IMPORT_ITEMS)
+      )
+    return texts
+
+  def _parse_json(self, raw):
+    try:
+      texts = json.loads(raw)
+    except ValueError:
+      raise forms.ValidationError(INVALID_IMPORT_ERROR)
+    if isinstance(texts, dict):
+      texts = texts.get('items')
+    if (
+      not isinstance(texts, list)
+      or not all(isinstance(text, str) for text in texts)
+    ):
+      raise forms.ValidationError(INVALID_IMPORT_ERROR)
+    return texts
+
+  def save(self, for_list):
+    texts = self.cleaned_data['items']
+    new_items = []
+    skipped = []
+    hashes = {text: item_text_hash(text) for text in texts}
+    with transaction.atomic():
+      seen = set(
+        for_list.item_set.filter(text_hash__in=set(hashes.values()))
+        .values_list('text_hash', flat=True)
+      )
+      for text in texts:
+        text_hash = hashes[text]
+        if text_hash in seen:
+          skipped.append(text)
+        else:
+          seen.add(text_hash)
+          new_items.append(
+            Item(list=for_list, text=text, text_hash=text_hash)
+          )
+      Item.objects.bulk_create(new_items, batch_size=IMPORT_BATCH_SIZE)
+      for_list.record_items_added(new_items)
+    if skipped:
+      metrics.inc_on_commit('superlists_duplicate_items_total', len(skipped))
+    return new_items, skipped
@@ -0,0 +1,130 @@
+import asyncio
+import threading
+import time
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.dispatch import receiver
+
+from lists.models import List
+from lists.signals import items_added
+
+# In-process pub/sub of list changes for the live list views. Subscribers
+# wait on the event loop they were created in; publish can be called from
+# any thread. A worker only hears of the writes it makes itself, so a
+# watcher thread also reads the versions of the watched lists every
+# LIST_EVENTS_CHECK_INTERVAL seconds, in one query however many
+# subscribers there are, and publishes the ones that moved.
+class ListEvents:
+  def __init__(self):
+    self._subscribers = {}
+    self._versions = {}
+    self._count = 0
+    self._watcher = None
+    self._lock = threading.Lock()
+
+  def __len__(self):
+    return self._count
+
+  # Returns None when the worker already holds as many subscribers as it
+  # may keep waiting.
+  def subscribe(self, list_id, version):
+    subscription = Subscription(self, list_id)
+    with self._lock:
+      if self._count >= settings.LIST_EVENTS_MAX_CONNECTIONS:
+        return None
+      self._subscribers.setdefault(list_id, set()).add(subscription)
+      self._versions[list_id] = max(
+        self._versions.get(list_id, version), version
+      )
+      self._count += 1
+      self._start_watcher()
+    return subscription
+
+  def unsubscribe(self, subscription):
+    with self._lock:
+      subscribers = self._subscribers.get(subscription.list_id, set())
+      if subscription not in subscribers:
+        return
+      subscribers.remove(subscription)
+      self._count -= 1
+      if not subscribers:
+        del self._subscribers[subscription.list_id]
+        del self._versions[subscription.list_id]
+
+  def publish(self, list_id, version):
+    with self._lock:
+      known = self._versions.get(list_id)
+      if known is None or version <= known:
+        return
+      self._versions[list_id] = version
+      subscribers = list(self._subscribers[list_id])
+    for subscription in subscribers:
+      subscription.notify()
+
+  def check_versions(self):
+    with self._lock:
+      list_ids = list(self._versions)
+    if not list_ids:
+      return
+    changed = List.objects.filter(id__in=list_ids).values_list('id', 'version')
+    for list_id, version in changed:
+      self.publish(list_id, version)
+
+  def _start_watcher(self):
+    if not settings.LIST_EVENTS_CHECK_INTERVAL:
+      return
+    # The watcher exits once the last subscriber leaves, so the next one
+    # to arrive starts it again.
+    if self._watcher is None or not self._watcher.is_alive():
+      self._watcher = threading.Thread(
+        target=self._watch, name='list-events', daemon=True
+      )
+      self._watcher.start()
+
+  def _watch(self):
+    try:
+      while settings.LIST_EVENTS_CHECK_INTERVAL:
+        time.sleep(settings.LIST_EVENTS_CHECK_INTERVAL)
+        with self._lock:
+          if not self._subscribers:
+            self._watcher = None
+            return
+        self.check_versions()
+    finally:
+      connections.close_all()
+
+
+class Subscription:
+  def __init__(self, events, list_id):
+    self.list_id = list_id
+    self._events = events
+    self._loop = asyncio.get_running_loop()
+    self._changed = asyncio.Event()
+
+  def notify(self):
+    try:
+      self._loop.call_soon_threadsafe(self._changed.set)
+    except RuntimeError:
+      # The loop has closed, along with the request that was waiting.
+      pass
+
+  # True when the list changed since the last call, False on timeout.
+  async def wait(self, timeout):
+    try:
+      await asyncio.wait_for(self._changed.wait(), timeout)
+    except TimeoutError:
+      return False
+    self._changed.clear()
+    return True
+
+  def close(self):
+    self._events.unsubscribe(self)
+
+
+events = ListEvents()
+
+@receiver(items_added)
+def publish_items_added(sender, list, items, **kwargs):
+  list_id, version = list.id, list.version
+  transaction.on_commit(lambda: events.publish(list_id, version))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from lists.models import Item, List
+
+class Command(BaseCommand):
+  help = 'Recompute the stored name and item count of every list'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=500)
+
+  def handle(self, *args, **options):
+    batch_size = options['batch_size']
+    items = Item.objects.filter(list=OuterRef('pk'))
+    first_text = items.order_by('id').values('text')[:1]
+    item_count = (
+      items.order_by().values('list').annotate(n=Count('id')).values('n')
+    )
+    last_id = 0
+    updated = 0
+    while True:
+      ids = list(
+        List.objects.filter(id__gt=last_id)
+        .order_by('id')
+        .values_list('id', flat=True)[:batch_size]
+      )
+      if not ids:
+        break
+      with transaction.atomic():
+        updated += List.objects.filter(id__in=ids).update(
+          name=Coalesce(Subquery(first_text), Value('')),
+          item_count=Coalesce(Subquery(item_count), Value(0)),
+        )
+      last_id = ids[-1]
+    self.stdout.write(f'Backfilled {updated} lists')
@@ -0,0 +1,101 @@
+import json
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+
+# Boots the site the way a server worker does, in a fresh interpreter,
+# and prints how long each phase took as JSON on the last line.
+BOOT_SCRIPT = """
+import json, time
+start = time.perf_counter()
+phases = {}
+def mark(name):
+  global start
+  now = time.perf_counter()
+  phases[name] = (now - start) * 1000
+  start = now
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+mark('settings')
+django.setup(set_prefix=False)
+mark('apps')
+from django.core.handlers.%(module)s import %(handler)s
+%(handler)s()
+mark('middleware')
+from django.urls import get_resolver
+get_resolver().url_patterns
+mark('urls')
+print(json.dumps(phases))
+"""
+
+HANDLERS = {
+  'asgi': {'module': 'asgi', 'handler': 'ASGIHandler'},
+  'wsgi': {'module': 'wsgi', 'handler': 'WSGIHandler'},
+}
+
+class Command(BaseCommand):
+  help = 'Report how long a worker takes to boot and what it imports'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--interface', choices=HANDLERS, default='asgi')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument(
+      '--depth', type=int, default=3,
+      help='Group imported modules by this many leading name parts',
+    )
+    parser.add_argument('--json', action='store_true')
+
+  def handle(self, *args, **options):
+    script = BOOT_SCRIPT % HANDLERS[options['interface']]
+    runs = [self.boot(script) for _ in range(options['runs'])]
+    # The median run by total time, so one slow start doesn't skew it.
+    runs.sort(key=lambda run: run['total'])
+    report = runs[len(runs) // 2]
+    report['imports'] = sorted(
+      group_imports(report.pop('importtime'), options['depth']).items(),
+      key=lambda item: -item[1],
+    )[:options['top']]
+
+    if options['json']:
+      self.stdout.write(json.dumps(report, indent=2))
+      return
+    self.stdout.write(
+      f'Median of {len(runs)} {options["interface"]} boots: '
+      f'{report["total"]:.1f}ms'
+    )
+    for name, ms in report['phases'].items():
+      self.stdout.write(f'  {name:<12}{ms:>8.1f}ms')
+    self.stdout.write(
+      f'Slowest imports (self time, grouped by {options["depth"]} parts):'
+    )
+    for name, ms in report['imports']:
+      self.stdout.write(f'  {name:<40}{ms:>8.1f}ms')
+
+  def boot(self, script):
+    start = time.perf_counter()
+    result = subprocess.run(
+      [sys.executable, '-X', 'importtime', '-c', script],
+      capture_output=True, text=True, check=True,
+    )
+    total = (time.perf_counter() - start) * 1000
+    phases = json.loads(result.stdout.strip().splitlines()[-1])
+    return {
+      'total': total,
+      'phases': {'interpreter': total - sum(phases.values()), **phases},
+      'importtime': result.stderr,
+    }
+
+def group_imports(importtime, depth):
+  groups = defaultdict(float)
+  for line in importtime.splitlines():
+    if not line.startswith('import time:') or 'imported package' in line:
+      continue
+    self_us, _, name = line[len('import time:'):].split('|')
+    name = '.'.join(name.strip().split('.')[:depth])
+    groups[name] += int(self_us) / 1000
+  return groups
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from lists.search import rebuild_search_index
+
+class Command(BaseCommand):
+  help = 'Rebuild the full-text search index of list items'
+
+  def handle(self, *args, **options):
+    rebuild_search_index()
+    self.stdout.write('Rebuilt search index')
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+
+from lists.models import Item, item_text_hash
+
+class Command(BaseCommand):
+  help = 'Recompute the duplicate check hash of every item'
+
+  def add_arguments(self, parser):
+    parser.add_argument('--batch-size', type=int, default=500)
+
+  def handle(self, *args, **options):
+    batch_size = options['batch_size']
+    last_id = 0
+    updated = 0
+    kept = 0
+    while True:
+      items = list(
+        Item.objects.filter(id__gt=last_id)
+        .order_by('id')
+        .only('id', 'text', 'text_hash')[:batch_size]
+      )
+      if not items:
+        break
+      with transaction.atomic():
+        for item in items:
+          text_hash = item_text_hash(item.text)
+          if text_hash == item.text_hash:
+            continue
+          # Another item of the list may already have this hash: once
+          # normalized, two items can turn out to be the same.
+          try:
+            with transaction.atomic():
+              Item.objects.filter(id=item.id).update(text_hash=text_hash)
+          except IntegrityError:
+            kept += 1
+          else:
+            updated += 1
+      last_id = items[-1].id
+    self.stdout.write(f'Rehashed {updated} items')
+    if kept:
+      self.stdout.write(
+        f'{kept} items clash with another item of their list and kept '
+        'their old hash; run again if you just turned normalizing off'
+      )
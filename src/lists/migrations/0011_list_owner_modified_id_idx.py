@@ -0,0 +1,23 @@
+# Generated by Django 5.2.9 on 2026-10-18 19:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0010_item_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['owner', '-modified', '-id'], name='list_owner_modified_id_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='list',
+            name='list_owner_modified_idx',
+        ),
+    ]
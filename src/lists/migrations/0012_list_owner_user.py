@@ -0,0 +1,58 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 5000
+
+
+# Copies each list's owner email into the owner's integer id, one range of
+# list ids per transaction, so a large database is never locked for long
+# and an interrupted run can simply be started again.
+def backfill_owner_user(apps, schema_editor):
+    List = apps.get_model('lists', 'List')
+    User = apps.get_model('accounts', 'User')
+    alias = schema_editor.connection.alias
+    lists = List.objects.using(alias)
+    owner_ids = User.objects.using(alias).filter(
+        email=models.OuterRef('owner_id')
+    ).values('id')
+    last_id = lists.aggregate(models.Max('id'))['id__max'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        with transaction.atomic(using=alias):
+            lists.filter(
+                id__gte=start,
+                id__lt=start + BATCH_SIZE,
+                owner__isnull=False,
+                owner_user__isnull=True,
+            ).update(owner_user=models.Subquery(owner_ids))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0011_list_owner_modified_id_idx'),
+        ('accounts', '0006_user_id'),
+    ]
+
+    operations = [
+        # A plain nullable column is added in place, without copying the
+        # table.
+        migrations.AddField(
+            model_name='list',
+            name='owner_user',
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                db_column='owner_user_id',
+                db_constraint=False,
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name='+',
+                to=settings.AUTH_USER_MODEL,
+                to_field='id',
+            ),
+        ),
+        migrations.RunPython(backfill_owner_user, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0012_list_owner_user'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='list',
+            name='list_owner_modified_id_idx',
+        ),
+        # The email column is left in the table for the AlterField below,
+        # which rebuilds the table once: owner_user_id is copied into a new
+        # owner_id column with a foreign key, and the email column is left
+        # behind.
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.RemoveField(
+                    model_name='list',
+                    name='owner',
+                ),
+                migrations.RenameField(
+                    model_name='list',
+                    old_name='owner_user',
+                    new_name='owner',
+                ),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='list',
+            name='owner',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='lists', to=settings.AUTH_USER_MODEL, to_field='id'),
+        ),
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['owner', '-modified', '-id'], name='list_owner_modified_id_idx'),
+        ),
+    ]
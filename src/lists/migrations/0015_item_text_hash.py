@@ -0,0 +1,88 @@
+from hashlib import blake2b
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 2000
+
+# Adding the column with a default and the index on its own keeps SQLite
+# from copying lists_item, which would also drop the search triggers. The
+# state gets the field and constraint Django would have made.
+ADD_COLUMN = (
+    'ALTER TABLE "lists_item" '
+    'ADD COLUMN "text_hash" varchar(32) NOT NULL DEFAULT \'\''
+)
+DROP_COLUMN = 'ALTER TABLE "lists_item" DROP COLUMN "text_hash"'
+
+CREATE_INDEX = (
+    'CREATE UNIQUE INDEX "item_list_text_hash_unique" '
+    'ON "lists_item" ("list_id", "text_hash")'
+)
+DROP_INDEX = 'DROP INDEX "item_list_text_hash_unique"'
+
+
+# Always the exact text: rows of the same list that only differ in case
+# would clash if they were hashed normalized. rehash_items switches them
+# over when NORMALIZE_DUPLICATE_ITEMS is on.
+def text_hash(text):
+    return blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def backfill_text_hash(apps, schema_editor):
+    connection = schema_editor.connection
+    last_id = 0
+    while True:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT id, text FROM lists_item "
+                    "WHERE id > %s AND text_hash = '' ORDER BY id LIMIT %s",
+                    [last_id, BATCH_SIZE],
+                )
+                rows = cursor.fetchall()
+                if not rows:
+                    break
+                cursor.executemany(
+                    'UPDATE lists_item SET text_hash = %s WHERE id = %s',
+                    [(text_hash(text), id_) for id_, text in rows],
+                )
+        last_id = rows[-1][0]
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0014_alter_list_owner'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(ADD_COLUMN, DROP_COLUMN),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='item',
+                    name='text_hash',
+                    field=models.CharField(blank=True, editable=False, max_length=32),
+                ),
+            ],
+        ),
+        migrations.RunPython(backfill_text_hash, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(CREATE_INDEX, DROP_INDEX),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='item',
+                    constraint=models.UniqueConstraint(fields=('list', 'text_hash'), name='item_list_text_hash_unique'),
+                ),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='item',
+            unique_together=set(),
+        ),
+    ]
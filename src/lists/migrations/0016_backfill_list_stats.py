@@ -0,0 +1,45 @@
+from django.db import migrations, models, transaction
+from django.db.models.functions import Coalesce
+
+BATCH_SIZE = 5000
+
+
+# 0008 added the name and item count with empty defaults, so lists made
+# before it showed a blank name and no items until backfill_list_stats was
+# run by hand. Lists still counting zero items are the ones it never
+# reached; one range of ids is filled in per transaction.
+def backfill_list_stats(apps, schema_editor):
+    List = apps.get_model('lists', 'List')
+    Item = apps.get_model('lists', 'Item')
+    alias = schema_editor.connection.alias
+    lists = List.objects.using(alias)
+    items = Item.objects.using(alias).filter(list=models.OuterRef('pk'))
+    first_text = items.order_by('id').values('text')[:1]
+    item_count = (
+        items.order_by().values('list')
+        .annotate(n=models.Count('id')).values('n')
+    )
+    last_id = lists.aggregate(models.Max('id'))['id__max'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        with transaction.atomic(using=alias):
+            lists.filter(
+                id__gte=start, id__lt=start + BATCH_SIZE, item_count=0
+            ).update(
+                name=Coalesce(models.Subquery(first_text), models.Value('')),
+                item_count=Coalesce(
+                    models.Subquery(item_count), models.Value(0)
+                ),
+            )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0015_item_text_hash'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_list_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,72 @@
+from importlib import import_module
+
+from django.db import migrations
+
+search_index = import_module('lists.migrations.0010_item_search_index')
+
+# The index keeps its own copy of the text next to the owner's id, so a
+# search only walks the searcher's rows instead of every user's matches.
+# SQLite drops these triggers when it copies lists_item or lists_list, so
+# migrations that rebuild either table have to create them again.
+CREATE_SEARCH_INDEX = [
+    """
+    CREATE VIRTUAL TABLE lists_item_fts USING fts5(
+        text,
+        owner,
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_insert AFTER INSERT ON lists_item BEGIN
+        INSERT INTO lists_item_fts (rowid, text, owner)
+        SELECT new.id, new.text, owner_id FROM lists_list
+        WHERE id = new.list_id;
+    END
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_delete AFTER DELETE ON lists_item BEGIN
+        DELETE FROM lists_item_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER lists_item_fts_update
+    AFTER UPDATE OF text, list_id ON lists_item BEGIN
+        UPDATE lists_item_fts SET
+            text = new.text,
+            owner = (SELECT owner_id FROM lists_list WHERE id = new.list_id)
+        WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER lists_list_fts_owner AFTER UPDATE OF owner_id ON lists_list
+    BEGIN
+        UPDATE lists_item_fts SET owner = new.owner_id
+        WHERE rowid IN (SELECT id FROM lists_item WHERE list_id = new.id);
+    END
+    """,
+    """
+    INSERT INTO lists_item_fts (rowid, text, owner)
+    SELECT lists_item.id, lists_item.text, lists_list.owner_id
+    FROM lists_item JOIN lists_list ON lists_list.id = lists_item.list_id
+    """,
+]
+
+DROP_SEARCH_INDEX = [
+    'DROP TRIGGER IF EXISTS lists_list_fts_owner',
+] + search_index.DROP_SEARCH_INDEX
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0016_backfill_list_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            search_index.run_on_sqlite(DROP_SEARCH_INDEX + CREATE_SEARCH_INDEX),
+            search_index.run_on_sqlite(
+                DROP_SEARCH_INDEX + search_index.CREATE_SEARCH_INDEX
+            ),
+        ),
+    ]
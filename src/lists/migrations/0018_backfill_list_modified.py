@@ -0,0 +1,47 @@
+from datetime import timedelta
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 5000
+
+
+# 0008 gave every existing list the same modified time, so my_lists showed
+# them in id order rather than by their latest item. Items carry no time,
+# so the lists still sharing the earliest modified time are spread out a
+# microsecond apart in the order of their newest item: the shown time
+# stays the migration's, and the order follows the most recent activity.
+def backfill_list_modified(apps, schema_editor):
+    List = apps.get_model('lists', 'List')
+    alias = schema_editor.connection.alias
+    modified = List.objects.using(alias).aggregate(
+        models.Min('modified')
+    )['modified__min']
+    if modified is None:
+        return
+    ids = list(
+        List.objects.using(alias)
+        .filter(modified=modified)
+        .annotate(newest_item=models.Max('item__id', default=0))
+        .order_by('-newest_item', '-id')
+        .values_list('id', flat=True)
+    )
+    for start in range(0, len(ids), BATCH_SIZE):
+        lists = [
+            List(id=id_, modified=modified - timedelta(microseconds=offset))
+            for offset, id_ in enumerate(ids[start:start + BATCH_SIZE], start)
+        ]
+        with transaction.atomic(using=alias):
+            List.objects.using(alias).bulk_update(lists, ['modified'])
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('lists', '0017_item_search_index_owner'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_list_modified, migrations.RunPython.noop),
+    ]
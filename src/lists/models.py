@@ -1,5 +1,12 @@
-from django.db import models
+from hashlib import blake2b
+
+from django.conf import settings
+from django.db import connections, models, router
+from django.db.models import Case, F, Q, Value, When
 from django.urls import reverse
+from django.utils import timezone
+
+from lists.signals import items_added
 
 class List(models.Model):
   owner = models.ForeignKey(
@@ -8,23 +15,140 @@ class List(models.Model):
     blank=True,
     null=True,
     on_delete=models.CASCADE,
+    # list_owner_modified_id_idx starts with the owner, so it serves
+    # lookups by owner too.
+    db_index=False,
   )
+  name = models.TextField(default='', blank=True)
+  item_count = models.PositiveIntegerField(default=0)
+  modified = models.DateTimeField(default=timezone.now)
+  version = models.PositiveIntegerField(default=0)
+
+  class Meta:
+    indexes = [
+      models.Index(
+        fields=['owner', '-modified', '-id'],
+        name='list_owner_modified_id_idx',
+      ),
+    ]
 
   def get_absolute_url(self):
     return reverse('view_list', args=[self.id])
+
+  def item_page(self, after, size):
+    items = list(self.item_set.filter(id__gt=after)[:size + 1])
+    if len(items) > size:
+      return items[:size], items[size - 1].id
+    return items, None
+
+  # Lists of an owner, most recently modified first, after the list that
+  # `before` (a (modified, id) pair) points at.
+  @classmethod
+  def owner_page(cls, owner, before, size):
+    lists = cls.objects.filter(owner=owner)
+    if before is not None:
+      modified, id_ = before
+      # modified <= m lets the index seek; the Q breaks ties on id.
+      lists = lists.filter(
+        Q(modified__lt=modified) | Q(id__lt=id_), modified__lte=modified
+      )
+    lists = list(
+      lists.order_by('-modified', '-id')
+      .only('id', 'name', 'item_count', 'modified', 'version')[:size + 1]
+    )
+    if len(lists) > size:
+      return lists[:size], lists[size - 1]
+    return lists, None
+
+  def record_items_added(self, items):
+    if not items:
+      return
+    now = timezone.now()
+    List.objects.filter(pk=self.pk).update(
+      name=Case(
+        When(name='', then=Value(items[0].text)),
+        default=F('name'),
+        output_field=models.TextField(),
+      ),
+      item_count=F('item_count') + len(items),
+      modified=now,
+      version=F('version') + 1,
+    )
+    if not self.name:
+      self.name = items[0].text
+    self.item_count += len(items)
+    self.modified = now
+    self.version += 1
+    items_added.send(sender=List, list=self, items=items)
   
-  @property
-  def name(self):
-    return self.item_set.first().text
-  
+
+# Duplicates are found by a fixed-width hash of the text, so the unique
+# index doesn't have to hold every item's full text.
+def item_text_hash(text, normalized=None):
+  if normalized is None:
+    normalized = settings.NORMALIZE_DUPLICATE_ITEMS
+  if normalized:
+    text = ' '.join(text.split()).casefold()
+  return blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+# Only a clash on the (list, text_hash) unique index is ignored; any other
+# constraint still fails the insert.
+INSERT_UNLESS_DUPLICATE = """
+  INSERT INTO lists_item (list_id, text, text_hash) VALUES (%s, %s, %s)
+  ON CONFLICT (list_id, text_hash) DO NOTHING
+  RETURNING id
+"""
+
+class ItemQuerySet(models.QuerySet):
+  def bulk_create(self, objs, *args, **kwargs):
+    objs = list(objs)
+    for item in objs:
+      if not item.text_hash:
+        item.text_hash = item_text_hash(item.text or '')
+    return super().bulk_create(objs, *args, **kwargs)
+
+  # Adds an item in one statement, or returns None when the list already
+  # has it, without the savepoint that catching an IntegrityError needs.
+  def create_unless_duplicate(self, list, text):
+    item = self.model(list=list, text=text, text_hash=item_text_hash(text))
+    db = router.db_for_write(self.model)
+    with connections[db].cursor() as cursor:
+      cursor.execute(INSERT_UNLESS_DUPLICATE, [list.id, text, item.text_hash])
+      row = cursor.fetchone()
+    if row is None:
+      return None
+    item.id = row[0]
+    item._state.adding = False
+    item._state.db = db
+    list.record_items_added([item])
+    return item
+
 
 class Item(models.Model):
   text = models.TextField(default='')
+  text_hash = models.CharField(max_length=32, blank=True, editable=False)
   list = models.ForeignKey(List, default=None, on_delete=models.CASCADE)
 
+  objects = ItemQuerySet.as_manager()
+
   class Meta:
     ordering = ('id',)
-    unique_together = ('list', 'text')
+    constraints = [
+      models.UniqueConstraint(
+        fields=['list', 'text_hash'], name='item_list_text_hash_unique'
+      ),
+    ]
 
   def __str__(self):
     return self.text
+
+  def clean(self):
+    self.text_hash = item_text_hash(self.text or '')
+
+  def save(self, *args, **kwargs):
+    self.text_hash = item_text_hash(self.text or '')
+    adding = self._state.adding
+    super().save(*args, **kwargs)
+    if adding:
+      self.list.record_items_added([self])
@@ -0,0 +1,58 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import F
+
+from lists.models import Item
+
+SEARCH_SQL = """
+  SELECT lists_item.id, lists_item.text, lists_item.list_id,
+         lists_list.name AS list_name
+  FROM lists_item_fts
+  JOIN lists_item ON lists_item.id = lists_item_fts.rowid
+  JOIN lists_list ON lists_list.id = lists_item.list_id
+  WHERE lists_item_fts MATCH %s
+  ORDER BY bm25(lists_item_fts, 1.0, 0.0), lists_item.id
+  LIMIT %s OFFSET %s
+"""
+
+REBUILD_SQL = """
+  INSERT INTO lists_item_fts (rowid, text, owner)
+  SELECT lists_item.id, lists_item.text, lists_list.owner_id
+  FROM lists_item JOIN lists_list ON lists_list.id = lists_item.list_id
+"""
+
+def match_expression(query):
+  # Quote every word so user input can't inject FTS5 syntax, and match
+  # each one as a prefix so results show up while still typing.
+  words = re.findall(r'\w+', query)
+  return ' '.join('"{}"*'.format(word) for word in words)
+
+# Only the owner's rows are matched and ranked; the owner column doesn't
+# count towards the rank.
+def owner_match_expression(user, expression):
+  return 'owner:"{}" AND text:({})'.format(user.pk, expression)
+
+def search_items(user, query, page, page_size):
+  expression = match_expression(query)
+  if not expression:
+    return [], False
+  offset = (page - 1) * page_size
+  # Other databases have no FTS5 index; fall back to a substring match.
+  if connection.vendor == 'sqlite':
+    results = list(Item.objects.raw(
+      SEARCH_SQL,
+      [owner_match_expression(user, expression), page_size + 1, offset],
+    ))
+  else:
+    results = list(
+      Item.objects.filter(list__owner=user, text__icontains=query.strip())
+      .annotate(list_name=F('list__name'))
+      [offset:offset + page_size + 1]
+    )
+  return results[:page_size], len(results) > page_size
+
+def rebuild_search_index():
+  with transaction.atomic(), connection.cursor() as cursor:
+    cursor.execute('DELETE FROM lists_item_fts')
+    cursor.execute(REBUILD_SQL)
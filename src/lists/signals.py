@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent with `list` and `items` whenever items are added to a list, both
+# by Item.save and by bulk inserts.
+items_added = Signal()
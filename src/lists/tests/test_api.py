@@ -0,0 +1,186 @@
+from django.test import TestCase, override_settings
+
+from accounts.models import User
+from lists.api import JSON_REQUIRED_ERROR
+from lists.forms import DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR
+from lists.models import Item, List
+
+class ListAPITest(TestCase):
+
+  def test_returns_list_with_etag(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    response = self.client.get(f'/api/lists/{current_list.id}/')
+    data = response.json()
+    self.assertEqual(data['id'], current_list.id)
+    self.assertEqual(data['name'], 'milk')
+    self.assertEqual(data['item_count'], 1)
+    self.assertEqual(data['html_url'], f'/lists/{current_list.id}/')
+    self.assertEqual(response['ETag'], f'"{current_list.id}-1"')
+
+  def test_owner_is_given_by_email(self):
+    owner = User.objects.create(email='a@b.com')
+    current_list = List.objects.create(owner=owner)
+    response = self.client.get(f'/api/lists/{current_list.id}/')
+    self.assertEqual(response.json()['owner'], 'a@b.com')
+
+  def test_matching_etag_returns_304_without_loading_items(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    url = f'/api/lists/{current_list.id}/'
+    etag = self.client.get(url)['ETag']
+    with self.assertNumQueries(1):
+      response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+    self.assertEqual(response.status_code, 304)
+
+  def test_etag_changes_when_item_added(self):
+    current_list = List.objects.create()
+    etag = self.client.get(f'/api/lists/{current_list.id}/')['ETag']
+    Item.objects.create(list=current_list, text='milk')
+    response = self.client.get(
+      f'/api/lists/{current_list.id}/', HTTP_IF_NONE_MATCH=etag
+    )
+    self.assertEqual(response.status_code, 200)
+    self.assertNotEqual(response['ETag'], etag)
+
+  def test_missing_list_is_404(self):
+    response = self.client.get('/api/lists/999/')
+    self.assertEqual(response.status_code, 404)
+
+
+@override_settings(LIST_PAGE_SIZE=2)
+class ListItemsAPITest(TestCase):
+
+  def test_returns_pages_of_items(self):
+    current_list = List.objects.create()
+    for text in ['a', 'b', 'c']:
+      Item.objects.create(list=current_list, text=text)
+    url = f'/api/lists/{current_list.id}/items/'
+
+    first = self.client.get(url).json()
+    self.assertEqual([item['text'] for item in first['items']], ['a', 'b'])
+    second = self.client.get(url, {'after': first['next']}).json()
+    self.assertEqual([item['text'] for item in second['items']], ['c'])
+    self.assertIsNone(second['next'])
+
+  def test_matching_etag_returns_304(self):
+    current_list = List.objects.create()
+    url = f'/api/lists/{current_list.id}/items/'
+    etag = self.client.get(url)['ETag']
+    with self.assertNumQueries(1):
+      response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+    self.assertEqual(response.status_code, 304)
+
+  def test_POST_adds_item(self):
+    current_list = List.objects.create()
+    response = self.client.post(
+      f'/api/lists/{current_list.id}/items/',
+      data={'text': 'milk'},
+      content_type='application/json'
+    )
+    self.assertEqual(response.status_code, 201)
+    item = Item.objects.get()
+    self.assertEqual(response.json(), {'id': item.id, 'text': 'milk'})
+    self.assertEqual(response['ETag'], f'"{current_list.id}-1"')
+
+  def test_POST_duplicate_item_returns_error(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    response = self.client.post(
+      f'/api/lists/{current_list.id}/items/',
+      data={'text': 'milk'},
+      content_type='application/json'
+    )
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.json(), {'errors': [DUPLICATE_ITEM_ERROR]})
+
+  def test_POST_empty_item_returns_error(self):
+    current_list = List.objects.create()
+    response = self.client.post(
+      f'/api/lists/{current_list.id}/items/',
+      data={'text': ''},
+      content_type='application/json'
+    )
+    self.assertEqual(response.json(), {'errors': [EMPTY_ITEM_ERROR]})
+
+  def test_POST_requires_json(self):
+    current_list = List.objects.create()
+    response = self.client.post(
+      f'/api/lists/{current_list.id}/items/', data={'text': 'milk'}
+    )
+    self.assertEqual(response.status_code, 415)
+    self.assertEqual(response.json(), {'errors': [JSON_REQUIRED_ERROR]})
+    self.assertFalse(Item.objects.exists())
+
+
+class NewListAPITest(TestCase):
+
+  def test_creates_list_with_first_item(self):
+    response = self.client.post(
+      '/api/lists/', data={'text': 'milk'}, content_type='application/json'
+    )
+    self.assertEqual(response.status_code, 201)
+    new_list = List.objects.get()
+    self.assertEqual(response.json()['id'], new_list.id)
+    self.assertEqual(new_list.item_set.get().text, 'milk')
+
+  def test_saves_owner_if_authenticated(self):
+    user = User.objects.create(email='a@b.com')
+    self.client.force_login(user)
+    self.client.post(
+      '/api/lists/', data={'text': 'milk'}, content_type='application/json'
+    )
+    self.assertEqual(List.objects.get().owner, user)
+
+  def test_empty_item_creates_nothing(self):
+    response = self.client.post(
+      '/api/lists/', data={'text': ''}, content_type='application/json'
+    )
+    self.assertEqual(response.json(), {'errors': [EMPTY_ITEM_ERROR]})
+    self.assertFalse(List.objects.exists())
+
+
+class UserListsAPITest(TestCase):
+
+  def test_returns_only_that_users_lists(self):
+    owner = User.objects.create(email='a@b.com')
+    other = User.objects.create(email='c@d.com')
+    mine = List.objects.create(owner=owner)
+    List.objects.create(owner=other)
+    response = self.client.get('/api/users/a@b.com/lists/')
+    self.assertEqual(
+      [list_['id'] for list_ in response.json()['lists']],
+      [mine.id]
+    )
+
+  def test_lists_are_listed_without_a_query_per_owner(self):
+    owner = User.objects.create(email='a@b.com')
+    for _ in range(3):
+      List.objects.create(owner=owner)
+    with self.assertNumQueries(2):
+      response = self.client.get('/api/users/a@b.com/lists/')
+    self.assertEqual(
+      [list_['owner'] for list_ in response.json()['lists']], ['a@b.com'] * 3
+    )
+
+  @override_settings(MY_LISTS_PAGE_SIZE=2)
+  def test_pages_follow_the_next_cursor(self):
+    owner = User.objects.create(email='a@b.com')
+    lists = [List.objects.create(owner=owner) for _ in range(3)]
+    response = self.client.get('/api/users/a@b.com/lists/')
+    first = response.json()
+    self.assertEqual(len(first['lists']), 2)
+
+    response = self.client.get(
+      '/api/users/a@b.com/lists/', {'before': first['next']}
+    )
+    second = response.json()
+    self.assertIsNone(second['next'])
+    self.assertEqual(
+      sorted(list_['id'] for list_ in first['lists'] + second['lists']),
+      [list_.id for list_ in lists],
+    )
+
+  def test_unknown_user_is_404(self):
+    response = self.client.get('/api/users/a@b.com/lists/')
+    self.assertEqual(response.status_code, 404)
@@ -0,0 +1,90 @@
+from unittest import mock
+
+from django.test import TestCase
+
+from accounts.models import User
+from lists.autocomplete import PrefixIndex, PrefixIndexCache, indexes, suggest
+from lists.forms import BulkItemForm
+from lists.models import Item, List
+
+class PrefixIndexTest(TestCase):
+
+  def test_completes_prefix_case_insensitively(self):
+    index = PrefixIndex({'Milk': 1, 'mint': 1, 'eggs': 1})
+    self.assertEqual(sorted(index.complete('MI', 10)), ['Milk', 'mint'])
+
+  def test_most_frequent_texts_come_first(self):
+    index = PrefixIndex({'milk': 1, 'mint': 5, 'millet': 3})
+    self.assertEqual(index.complete('mi', 2), ['mint', 'millet'])
+
+  def test_no_matches(self):
+    index = PrefixIndex({'milk': 1})
+    self.assertEqual(index.complete('eg', 10), [])
+
+
+class PrefixIndexCacheTest(TestCase):
+
+  @mock.patch('lists.autocomplete.build_index')
+  def test_builds_index_once_per_user(self, mock_build_index):
+    cache = PrefixIndexCache(maxsize=2, ttl=60)
+    cache.get(1)
+    cache.get(1)
+    self.assertEqual(mock_build_index.call_count, 1)
+
+  @mock.patch('lists.autocomplete.build_index')
+  def test_evicts_least_recently_used_user(self, mock_build_index):
+    cache = PrefixIndexCache(maxsize=2, ttl=60)
+    cache.get(1)
+    cache.get(2)
+    cache.get(1)
+    cache.get(3)
+    cache.get(1)
+    cache.get(2)
+    self.assertEqual(
+      [c.args for c in mock_build_index.call_args_list],
+      [(1,), (2,), (3,), (2,)]
+    )
+
+
+class SuggestTest(TestCase):
+
+  def setUp(self):
+    indexes.clear()
+    self.user = User.objects.create(email='a@b.com')
+
+  def add(self, *texts):
+    for text in texts:
+      Item.objects.create(
+        list=List.objects.create(owner=self.user), text=text
+      )
+
+  def test_suggests_users_most_used_texts(self):
+    self.add('milk', 'milk', 'mint')
+    self.assertEqual(suggest(self.user, 'mi', 8), ['milk', 'mint'])
+
+  def test_ignores_other_users_items(self):
+    Item.objects.create(list=List.objects.create(), text='milk')
+    self.assertEqual(suggest(self.user, 'mi', 8), [])
+
+  def test_repeated_lookups_do_not_query(self):
+    self.add('milk')
+    suggest(self.user, 'm', 8)
+    with self.assertNumQueries(0):
+      self.assertEqual(suggest(self.user, 'mi', 8), ['milk'])
+
+  def test_new_items_show_up(self):
+    self.add('milk')
+    suggest(self.user, 'm', 8)
+    self.add('mint', 'mint')
+    self.assertEqual(suggest(self.user, 'm', 8), ['mint', 'milk'])
+
+  def test_bulk_imported_items_show_up(self):
+    suggest(self.user, 'm', 8)
+    form = BulkItemForm(data={'items': 'milk'})
+    form.is_valid()
+    form.save(for_list=List.objects.create(owner=self.user))
+    self.assertEqual(suggest(self.user, 'm', 8), ['milk'])
+
+  def test_blank_prefix_suggests_nothing(self):
+    self.add('milk')
+    self.assertEqual(suggest(self.user, ' ', 8), [])
@@ -0,0 +1,50 @@
+from django.core.cache import caches
+from django.test import TestCase
+
+from accounts.models import User
+from lists import cache
+from lists.models import Item, List
+
+class ItemTableCacheTest(TestCase):
+
+  def setUp(self):
+    caches['lists'].clear()
+    cache.stats.reset()
+
+  def test_second_view_is_served_from_cache(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    url = f'/lists/{current_list.id}/'
+    self.client.get(url)
+    with self.assertNumQueries(1):
+      response = self.client.get(url)
+    self.assertContains(response, '1: milk')
+    self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+    self.assertEqual(cache.stats.hit_rate, 0.5)
+
+  def test_adding_an_item_invalidates_cached_table(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    url = f'/lists/{current_list.id}/'
+    self.client.get(url)
+    self.client.post(url, data={'text': 'eggs'})
+    response = self.client.get(url)
+    self.assertContains(response, '2: eggs')
+
+  def test_bulk_import_invalidates_cached_table(self):
+    current_list = List.objects.create()
+    url = f'/lists/{current_list.id}/'
+    self.client.get(url)
+    self.client.post(f'{url}import', data={'items': 'milk\neggs'})
+    response = self.client.get(url)
+    self.assertContains(response, '2: eggs')
+
+  def test_navbar_is_rendered_per_user(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    url = f'/lists/{current_list.id}/'
+    self.client.get(url)
+    self.client.force_login(User.objects.create(email='a@b.com'))
+    response = self.client.get(url)
+    self.assertContains(response, 'Logged in as a@b.com')
+    self.assertEqual(cache.stats.hits, 1)
@@ -0,0 +1,81 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from lists.management.commands.boot_profile import group_imports
+from lists.models import Item, List, item_text_hash
+
+class BackfillListStatsTest(TestCase):
+
+  def test_backfills_name_and_item_count(self):
+    list_ = List.objects.create()
+    Item.objects.create(list=list_, text='first')
+    Item.objects.create(list=list_, text='second')
+    List.objects.update(name='', item_count=0)
+
+    call_command('backfill_list_stats', batch_size=1, stdout=StringIO())
+
+    list_.refresh_from_db()
+    self.assertEqual(list_.name, 'first')
+    self.assertEqual(list_.item_count, 2)
+
+  def test_empty_lists_get_blank_name_and_zero_count(self):
+    list_ = List.objects.create(name='stale', item_count=3)
+    call_command('backfill_list_stats', stdout=StringIO())
+    list_.refresh_from_db()
+    self.assertEqual(list_.name, '')
+    self.assertEqual(list_.item_count, 0)
+
+
+class RehashItemsTest(TestCase):
+
+  def test_rehashes_items_for_the_current_mode(self):
+    list_ = List.objects.create()
+    item = Item.objects.create(list=list_, text='Buy  Milk')
+    with override_settings(NORMALIZE_DUPLICATE_ITEMS=True):
+      call_command('rehash_items', batch_size=1, stdout=StringIO())
+    item.refresh_from_db()
+    self.assertEqual(
+      item.text_hash, item_text_hash('buy milk', normalized=True)
+    )
+
+  @override_settings(NORMALIZE_DUPLICATE_ITEMS=True)
+  def test_items_that_become_duplicates_keep_their_hash(self):
+    list_ = List.objects.create()
+    with override_settings(NORMALIZE_DUPLICATE_ITEMS=False):
+      Item.objects.create(list=list_, text='milk')
+      clash = Item.objects.create(list=list_, text='Milk')
+    out = StringIO()
+    call_command('rehash_items', stdout=out)
+    self.assertIn('1 items clash', out.getvalue())
+    clash.refresh_from_db()
+    self.assertEqual(
+      clash.text_hash, item_text_hash('Milk', normalized=False)
+    )
+
+
+class BootProfileTest(TestCase):
+
+  def test_groups_import_times_by_module_prefix(self):
+    importtime = '\n'.join([
+      'import time: self [us] | cumulative | imported package',
+      'import time:      1500 |       1500 |     django.core.mail.message',
+      'import time:       500 |       2000 |   django.core.mail',
+      'import time:      2000 |       2000 | lists.views',
+    ])
+    self.assertEqual(
+      group_imports(importtime, depth=2),
+      {'django.core': 2.0, 'lists.views': 2.0},
+    )
+
+  def test_reports_boot_phases(self):
+    out = StringIO()
+    call_command('boot_profile', runs=1, json=True, stdout=out)
+    report = json.loads(out.getvalue())
+    self.assertEqual(
+      list(report['phases']),
+      ['interpreter', 'settings', 'apps', 'middleware', 'urls'],
+    )
+    self.assertTrue(report['imports'])
@@ -1,8 +1,13 @@
-from django.test import TestCase
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
 
 from lists.forms import (
   DUPLICATE_ITEM_ERROR, 
+  EMPTY_IMPORT_ERROR,
   EMPTY_ITEM_ERROR, 
+  INVALID_IMPORT_ERROR,
+  MAX_IMPORT_ITEMS,
+  BulkItemForm,
   ExistingListItemForm,
   ItemForm
 )
@@ -36,12 +41,28 @@ class ExistingListItemFormTest(TestCase):
     self.assertFalse(form.is_valid())
     self.assertEqual(form.errors['text'], [EMPTY_ITEM_ERROR])
 
-  def test_form_validation_for_duplicate_items(self):
+  def test_form_save_rejects_duplicate_items(self):
     list1 = List.objects.create()
     Item.objects.create(list=list1, text='no twins')
     form = ExistingListItemForm(for_list=list1, data={'text': 'no twins'})
-    self.assertFalse(form.is_valid())
+    self.assertTrue(form.is_valid())
+    self.assertIsNone(form.save())
     self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+    self.assertEqual(Item.objects.count(), 1)
+
+  def test_validation_does_not_query_for_duplicates(self):
+    list1 = List.objects.create()
+    form = ExistingListItemForm(for_list=list1, data={'text': 'no twins'})
+    with self.assertNumQueries(0):
+      form.is_valid()
+
+  def test_duplicate_does_not_change_list_stats(self):
+    list1 = List.objects.create()
+    Item.objects.create(list=list1, text='no twins')
+    form = ExistingListItemForm(for_list=list1, data={'text': 'no twins'})
+    form.is_valid()
+    form.save()
+    self.assertEqual(List.objects.get().item_count, 1)
 
   def test_form_save(self):
     current_list = List.objects.create()
@@ -49,3 +70,102 @@ class ExistingListItemFormTest(TestCase):
     self.assertTrue(form.is_valid())
     new_item = form.save()
     self.assertEqual(new_item, Item.objects.get())
+
+  def test_save_is_an_insert_and_a_stats_update(self):
+    current_list = List.objects.create()
+    form = ExistingListItemForm(for_list=current_list, data={'text': 'hi'})
+    form.is_valid()
+    with self.assertNumQueries(2):
+      form.save()
+    self.assertEqual(List.objects.get().item_count, 1)
+
+  def test_duplicate_is_a_single_query(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='hi')
+    form = ExistingListItemForm(for_list=current_list, data={'text': 'hi'})
+    form.is_valid()
+    with self.assertNumQueries(1):
+      self.assertIsNone(form.save())
+
+  def test_other_integrity_errors_are_not_reported_as_duplicates(self):
+    form = ExistingListItemForm(for_list=List(), data={'text': 'hi'})
+    form.is_valid()
+    with self.assertRaises(IntegrityError):
+      form.save()
+    self.assertNotIn('text', form.errors)
+
+
+class BulkItemFormTest(TestCase):
+
+  def test_splits_lines_and_ignores_blank_ones(self):
+    form = BulkItemForm(data={'items': 'milk\n\n  eggs  \r\nbread\n'})
+    self.assertTrue(form.is_valid())
+    self.assertEqual(form.cleaned_data['items'], ['milk', 'eggs', 'bread'])
+
+  def test_accepts_json_list(self):
+    form = BulkItemForm(data={'items': '["milk", "eggs"]'})
+    self.assertTrue(form.is_valid())
+    self.assertEqual(form.cleaned_data['items'], ['milk', 'eggs'])
+
+  def test_accepts_json_object_with_items(self):
+    form = BulkItemForm(data={'items': '{"items": ["milk"]}'})
+    self.assertTrue(form.is_valid())
+    self.assertEqual(form.cleaned_data['items'], ['milk'])
+
+  def test_rejects_malformed_json(self):
+    form = BulkItemForm(data={'items': '["milk", 3]'})
+    self.assertFalse(form.is_valid())
+    self.assertEqual(form.errors['items'], [INVALID_IMPORT_ERROR])
+
+  def test_rejects_blank_import(self):
+    form = BulkItemForm(data={'items': '\n  \n'})
+    self.assertFalse(form.is_valid())
+    self.assertEqual(form.errors['items'], [EMPTY_IMPORT_ERROR])
+
+  def test_rejects_too_many_items(self):
+    lines = '\n'.join(f'item {n}' for n in range(MAX_IMPORT_ITEMS + 1))
+    form = BulkItemForm(data={'items': lines})
+    self.assertFalse(form.is_valid())
+
+  def test_save_skips_existing_and_repeated_items(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    form = BulkItemForm(data={'items': 'milk\neggs\nbread\neggs'})
+    form.is_valid()
+
+    new_items, skipped = form.save(for_list=current_list)
+
+    self.assertEqual([item.text for item in new_items], ['eggs', 'bread'])
+    self.assertEqual(skipped, ['milk', 'eggs'])
+    self.assertEqual(
+      [item.text for item in current_list.item_set.all()],
+      ['milk', 'eggs', 'bread']
+    )
+
+  @override_settings(NORMALIZE_DUPLICATE_ITEMS=True)
+  def test_save_skips_normalized_duplicates(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='Milk')
+    form = BulkItemForm(data={'items': 'milk\neggs\nEGGS'})
+    form.is_valid()
+    new_items, skipped = form.save(for_list=current_list)
+    self.assertEqual([item.text for item in new_items], ['eggs'])
+    self.assertEqual(skipped, ['milk', 'EGGS'])
+
+  def test_save_updates_list_stats(self):
+    current_list = List.objects.create()
+    form = BulkItemForm(data={'items': 'milk\neggs'})
+    form.is_valid()
+    form.save(for_list=current_list)
+    current_list.refresh_from_db()
+    self.assertEqual(current_list.name, 'milk')
+    self.assertEqual(current_list.item_count, 2)
+
+  def test_save_uses_a_constant_number_of_queries(self):
+    current_list = List.objects.create()
+    lines = '\n'.join(f'item {n}' for n in range(50))
+    form = BulkItemForm(data={'items': lines})
+    form.is_valid()
+    # savepoint, duplicate check, insert, list stats update, release
+    with self.assertNumQueries(5):
+      form.save(for_list=current_list)
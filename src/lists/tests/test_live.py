@@ -0,0 +1,216 @@
+import asyncio
+import json
+import threading
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.db.models import F
+from django.test import TestCase, override_settings
+
+from lists import live
+from lists.live import ListEvents
+from lists.models import Item, List
+
+@override_settings(
+  LIST_EVENTS_MAX_CONNECTIONS=2, LIST_EVENTS_CHECK_INTERVAL=None
+)
+class ListEventsTest(TestCase):
+
+  def setUp(self):
+    self.events = ListEvents()
+
+  async def test_publish_wakes_subscribers_of_that_list(self):
+    subscription = self.events.subscribe(1, 0)
+    other = self.events.subscribe(2, 0)
+    self.events.publish(1, 1)
+    self.assertTrue(await subscription.wait(1))
+    self.assertFalse(await other.wait(0.01))
+
+  async def test_wait_times_out_without_changes(self):
+    subscription = self.events.subscribe(1, 0)
+    self.assertFalse(await subscription.wait(0.01))
+
+  async def test_ignores_versions_already_seen(self):
+    subscription = self.events.subscribe(1, 5)
+    self.events.publish(1, 5)
+    self.assertFalse(await subscription.wait(0.01))
+
+  async def test_publish_from_another_thread(self):
+    subscription = self.events.subscribe(1, 0)
+    threading.Thread(target=self.events.publish, args=(1, 1)).start()
+    self.assertTrue(await subscription.wait(1))
+
+  async def test_refuses_subscribers_over_the_limit(self):
+    first = self.events.subscribe(1, 0)
+    self.events.subscribe(2, 0)
+    self.assertIsNone(self.events.subscribe(3, 0))
+    first.close()
+    self.assertIsNotNone(self.events.subscribe(3, 0))
+
+  async def test_close_is_idempotent(self):
+    subscription = self.events.subscribe(1, 0)
+    subscription.close()
+    subscription.close()
+    self.assertEqual(len(self.events), 0)
+
+  async def test_check_versions_publishes_changes_from_other_workers(self):
+    current_list = await List.objects.acreate()
+    subscription = self.events.subscribe(current_list.id, current_list.version)
+    await sync_to_async(self.events.check_versions)()
+    self.assertFalse(await subscription.wait(0.01))
+
+    await List.objects.filter(id=current_list.id).aupdate(
+      version=F('version') + 1
+    )
+    await sync_to_async(self.events.check_versions)()
+    self.assertTrue(await subscription.wait(1))
+
+  async def test_adding_an_item_publishes_on_commit(self):
+    current_list = await List.objects.acreate()
+    subscription = self.events.subscribe(current_list.id, current_list.version)
+
+    def add_item():
+      with self.captureOnCommitCallbacks(execute=True):
+        Item.objects.create(list=current_list, text='milk')
+
+    with mock.patch.object(live, 'events', self.events):
+      await sync_to_async(add_item)()
+    self.assertTrue(await subscription.wait(1))
+
+
+@override_settings(
+  LIST_EVENTS_MAX_CONNECTIONS=10,
+  LIST_EVENTS_CHECK_INTERVAL=None,
+  LIST_EVENTS_HEARTBEAT=5,
+  LIST_EVENTS_POLL_TIMEOUT=5,
+)
+class LiveListViewsTest(TestCase):
+
+  def setUp(self):
+    patcher = mock.patch.object(live, 'events', ListEvents())
+    self.events = patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def create_list(self, n_items):
+    current_list = List.objects.create()
+    items = [
+      Item.objects.create(list=current_list, text=f'item {n}')
+      for n in range(1, n_items + 1)
+    ]
+    current_list.refresh_from_db()
+    return current_list, items
+
+  def add_item(self, current_list, text):
+    with self.captureOnCommitCallbacks(execute=True):
+      return Item.objects.create(list=current_list, text=text)
+
+  async def open_stream(self, url, **kwargs):
+    response = await self.async_client.get(url, **kwargs)
+    return response, aiter(response.streaming_content)
+
+  async def test_stream_sends_items_after_the_cursor(self):
+    current_list, items = await sync_to_async(self.create_list)(3)
+    response, stream = await self.open_stream(
+      f'/lists/{current_list.id}/events?after={items[0].id}'
+    )
+    self.assertEqual(response['Content-Type'], 'text/event-stream')
+    self.assertEqual(await anext(stream), b'retry: 10000\n\n')
+    self.assertEqual(
+      await anext(stream),
+      f'event: items\nid: {items[2].id}\n'
+      'data: <tr><td>2: item 2</td></tr>\n'
+      'data: <tr><td>3: item 3</td></tr>\n\n'.encode(),
+    )
+
+  async def test_stream_resumes_from_last_event_id(self):
+    current_list, items = await sync_to_async(self.create_list)(2)
+    _, stream = await self.open_stream(
+      f'/lists/{current_list.id}/events?after=0',
+      headers={'Last-Event-ID': str(items[0].id)},
+    )
+    await anext(stream)
+    event = await anext(stream)
+    self.assertNotIn(b'item 1', event)
+    self.assertIn(b'2: item 2', event)
+
+  async def test_stream_pushes_items_added_later(self):
+    current_list, items = await sync_to_async(self.create_list)(1)
+    _, stream = await self.open_stream(
+      f'/lists/{current_list.id}/events?after={items[0].id}'
+    )
+    await anext(stream)
+    next_event = asyncio.ensure_future(anext(stream))
+    await asyncio.sleep(0.01)
+    self.assertFalse(next_event.done())
+
+    item = await sync_to_async(self.add_item)(current_list, 'milk')
+    event = await asyncio.wait_for(next_event, 1)
+    self.assertIn(f'id: {item.id}\n'.encode(), event)
+    self.assertIn(b'2: milk', event)
+
+  @override_settings(LIST_EVENTS_HEARTBEAT=0.01)
+  async def test_stream_sends_heartbeats_while_idle(self):
+    current_list, _ = await sync_to_async(self.create_list)(0)
+    _, stream = await self.open_stream(f'/lists/{current_list.id}/events')
+    await anext(stream)
+    self.assertEqual(await anext(stream), b': keep-alive\n\n')
+
+  @override_settings(LIST_EVENTS_MAX_AGE=0)
+  async def test_stream_ends_at_max_age_and_frees_its_slot(self):
+    current_list, _ = await sync_to_async(self.create_list)(0)
+    _, stream = await self.open_stream(f'/lists/{current_list.id}/events')
+    self.assertEqual(len(self.events), 1)
+    self.assertEqual([chunk async for chunk in stream], [b'retry: 10000\n\n'])
+    self.assertEqual(len(self.events), 0)
+
+  @override_settings(LIST_EVENTS_MAX_CONNECTIONS=0)
+  async def test_stream_refused_when_worker_is_full(self):
+    current_list, _ = await sync_to_async(self.create_list)(0)
+    response = await self.async_client.get(
+      f'/lists/{current_list.id}/events'
+    )
+    self.assertEqual(response.status_code, 503)
+    self.assertEqual(response['Retry-After'], '10')
+
+  async def poll(self, current_list, after):
+    response = await self.async_client.get(
+      f'/lists/{current_list.id}/poll', {'after': after}
+    )
+    if response.streaming:
+      content = b''.join([chunk async for chunk in response.streaming_content])
+    else:
+      content = response.content
+    return response, json.loads(content)
+
+  async def test_poll_returns_new_rows_at_once(self):
+    current_list, items = await sync_to_async(self.create_list)(2)
+    response, data = await self.poll(current_list, items[0].id)
+    self.assertEqual(data['after'], items[1].id)
+    self.assertIn('2: item 2', data['rows'])
+    self.assertNotIn('Retry-After', response)
+    self.assertEqual(len(self.events), 0)
+
+  async def test_poll_waits_for_the_next_item(self):
+    current_list, items = await sync_to_async(self.create_list)(1)
+    poll = asyncio.ensure_future(self.poll(current_list, items[0].id))
+    await asyncio.sleep(0.01)
+    self.assertFalse(poll.done())
+
+    item = await sync_to_async(self.add_item)(current_list, 'milk')
+    _, data = await asyncio.wait_for(poll, 1)
+    self.assertEqual(data['after'], item.id)
+    self.assertIn('2: milk', data['rows'])
+
+  @override_settings(LIST_EVENTS_POLL_TIMEOUT=0.01)
+  async def test_poll_times_out_with_no_rows(self):
+    current_list, items = await sync_to_async(self.create_list)(1)
+    _, data = await self.poll(current_list, items[0].id)
+    self.assertEqual(data, {'after': items[0].id, 'rows': ''})
+    self.assertEqual(len(self.events), 0)
+
+  @override_settings(LIST_EVENTS_MAX_CONNECTIONS=0)
+  async def test_poll_answers_at_once_when_worker_is_full(self):
+    current_list, items = await sync_to_async(self.create_list)(1)
+    response, data = await self.poll(current_list, items[0].id)
+    self.assertEqual(data['rows'], '')
+    self.assertEqual(response['Retry-After'], '10')
@@ -1,6 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db.utils import IntegrityError
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from accounts.models import User
 from lists.models import Item, List
@@ -39,6 +39,25 @@ class ItemModelTest(TestCase):
       duplicate = Item(list=current_list, text='bla')
       duplicate.full_clean()
 
+  def test_duplicates_differing_in_case_are_allowed_by_default(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='bla')
+    Item.objects.create(list=current_list, text='Bla')
+    self.assertEqual(current_list.item_set.count(), 2)
+
+  @override_settings(NORMALIZE_DUPLICATE_ITEMS=True)
+  def test_normalized_duplicates_ignore_case_and_whitespace(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='buy milk')
+    with self.assertRaises(ValidationError):
+      Item(list=current_list, text='  Buy\tMILK ').full_clean()
+    with self.assertRaises(IntegrityError):
+      Item.objects.create(list=current_list, text='Buy  milk')
+
+  def test_save_stores_fixed_width_text_hash(self):
+    item = Item.objects.create(list=List.objects.create(), text='x' * 10000)
+    self.assertEqual(len(item.text_hash), 32)
+
   def test_can_save_item_to_different_lists(self):
     list1 = List.objects.create()
     list2 = List.objects.create()
@@ -84,3 +103,16 @@ class ListModelTest(TestCase):
     Item.objects.create(list=list_, text='second item')
     self.assertEqual(list_.name, 'first item')
 
+  def test_adding_items_updates_stored_name_and_count(self):
+    list_ = List.objects.create()
+    Item.objects.create(list=list_, text='first item')
+    Item.objects.create(list=list_, text='second item')
+    stored = List.objects.get(id=list_.id)
+    self.assertEqual(stored.name, 'first item')
+    self.assertEqual(stored.item_count, 2)
+
+  def test_adding_items_updates_modified_time(self):
+    list_ = List.objects.create()
+    created = List.objects.get(id=list_.id).modified
+    Item.objects.create(list=list_, text='an item')
+    self.assertGreater(List.objects.get(id=list_.id).modified, created)
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from accounts.models import User
+from lists.models import Item, List
+from lists.search import (
+  match_expression, owner_match_expression, search_items
+)
+
+class SearchItemsTest(TestCase):
+
+  def setUp(self):
+    self.user = User.objects.create(email='a@b.com')
+    self.list = List.objects.create(owner=self.user)
+
+  def search(self, query, page=1, page_size=20):
+    results, has_next = search_items(self.user, query, page, page_size)
+    return [item.text for item in results]
+
+  def test_finds_items_by_word_prefix(self):
+    Item.objects.create(list=self.list, text='Buy peacock feathers')
+    Item.objects.create(list=self.list, text='Make a fly')
+    self.assertEqual(self.search('peac'), ['Buy peacock feathers'])
+
+  def test_results_include_list_name(self):
+    Item.objects.create(list=self.list, text='milk')
+    [result], _ = search_items(self.user, 'milk', 1, 20)
+    self.assertEqual(result.list_id, self.list.id)
+    self.assertEqual(result.list_name, 'milk')
+
+  def test_only_searches_users_own_lists(self):
+    other_list = List.objects.create(
+      owner=User.objects.create(email='c@d.com')
+    )
+    Item.objects.create(list=other_list, text='milk')
+    Item.objects.create(list=List.objects.create(), text='milk')
+    self.assertEqual(self.search('milk'), [])
+
+  def test_other_users_matches_never_leave_the_index(self):
+    other_list = List.objects.create(
+      owner=User.objects.create(email='c@d.com')
+    )
+    Item.objects.bulk_create(
+      Item(list=other_list, text=f'milk {n}') for n in range(50)
+    )
+    Item.objects.create(list=self.list, text='milk')
+    expression = owner_match_expression(self.user, match_expression('milk'))
+    with connection.cursor() as cursor:
+      cursor.execute(
+        'SELECT count(*) FROM lists_item_fts WHERE lists_item_fts MATCH %s',
+        [expression],
+      )
+      self.assertEqual(cursor.fetchone(), (1,))
+
+  def test_index_follows_list_owner_changes(self):
+    other_list = List.objects.create()
+    Item.objects.create(list=other_list, text='milk')
+    self.assertEqual(self.search('milk'), [])
+    List.objects.filter(id=other_list.id).update(owner=self.user)
+    self.assertEqual(self.search('milk'), ['milk'])
+
+  def test_index_follows_bulk_inserts_updates_and_deletes(self):
+    Item.objects.bulk_create([
+      Item(list=self.list, text='oat milk'),
+      Item(list=self.list, text='eggs'),
+    ])
+    self.assertEqual(self.search('milk'), ['oat milk'])
+    Item.objects.filter(text='oat milk').update(text='soy drink')
+    self.assertEqual(self.search('milk'), [])
+    self.assertEqual(self.search('soy'), ['soy drink'])
+    Item.objects.filter(text='soy drink').delete()
+    self.assertEqual(self.search('soy'), [])
+
+  def test_best_matches_come_first(self):
+    Item.objects.create(list=self.list, text='milk chocolate bar wrapper')
+    Item.objects.create(list=self.list, text='milk milk')
+    self.assertEqual(
+      self.search('milk'), ['milk milk', 'milk chocolate bar wrapper']
+    )
+
+  def test_paginates_results(self):
+    for n in range(3):
+      Item.objects.create(list=self.list, text=f'milk {n}')
+    first, has_next = search_items(self.user, 'milk', 1, 2)
+    self.assertEqual(len(first), 2)
+    self.assertTrue(has_next)
+    second, has_next = search_items(self.user, 'milk', 2, 2)
+    self.assertEqual(len(second), 1)
+    self.assertFalse(has_next)
+
+  def test_search_syntax_in_query_is_treated_as_words(self):
+    Item.objects.create(list=self.list, text='rock and roll')
+    self.assertEqual(self.search('rock AND "roll'), ['rock and roll'])
+    self.assertEqual(self.search('"*'), [])
+
+  def test_match_expression_quotes_words(self):
+    self.assertEqual(match_expression('new "york'), '"new"* "york"*')
+
+  def test_rebuild_command_restores_index(self):
+    Item.objects.create(list=self.list, text='milk')
+    with connection.cursor() as cursor:
+      cursor.execute('DELETE FROM lists_item_fts')
+    self.assertEqual(self.search('milk'), [])
+    call_command('rebuild_search_index', stdout=StringIO())
+    self.assertEqual(self.search('milk'), ['milk'])
@@ -1,12 +1,21 @@
+from asgiref.sync import sync_to_async
+from django.db import connection
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import html
 import lxml.html
 from unittest import skip
 
 from accounts.models import User
-from lists.forms import DUPLICATE_ITEM_ERROR, EMPTY_ITEM_ERROR
+from lists.forms import (
+  DUPLICATE_ITEM_ERROR,
+  EMPTY_IMPORT_ERROR,
+  EMPTY_ITEM_ERROR,
+  INVALID_IMPORT_ERROR,
+)
 from lists.models import Item, List
+from lists.views import list_cursor
 
 class HomePageTest(TestCase):
 
@@ -42,8 +51,160 @@ class MyListTest(TestCase):
     correct_user = User.objects.create(email='a@b.com')
     response = self.client.get(reverse('my_lists', args=('a@b.com',)))
     self.assertEqual(response.context['owner'], correct_user)
+
+  def test_lists_are_rendered_without_a_query_per_list(self):
+    owner = User.objects.create(email='a@b.com')
+    for n in range(5):
+      list_ = List.objects.create(owner=owner)
+      Item.objects.create(list=list_, text=f'item {n}')
+    with self.assertNumQueries(3):
+      response = self.client.get(reverse('my_lists', args=('a@b.com',)))
+    self.assertContains(response, 'item 4')
+
+  def test_unchanged_lists_are_not_modified(self):
+    owner = User.objects.create(email='a@b.com')
+    List.objects.create(owner=owner)
+    url = reverse('my_lists', args=('a@b.com',))
+    self.client.get(url)  # sets the CSRF cookie
+    etag = self.client.get(url)['ETag']
+    with self.assertNumQueries(2):
+      response = self.client.get(url, headers={'If-None-Match': etag})
+    self.assertEqual(response.status_code, 304)
+
+  def test_new_activity_changes_etag(self):
+    owner = User.objects.create(email='a@b.com')
+    list_ = List.objects.create(owner=owner)
+    url = reverse('my_lists', args=('a@b.com',))
+    etag = self.client.get(url)['ETag']
+    Item.objects.create(list=list_, text='new item')
+    response = self.client.get(url, headers={'If-None-Match': etag})
+    self.assertEqual(response.status_code, 200)
+    self.assertNotEqual(response['ETag'], etag)
+
+  def test_each_page_has_its_own_etag(self):
+    owner = User.objects.create(email='a@b.com')
+    list_ = List.objects.create(owner=owner)
+    url = reverse('my_lists', args=('a@b.com',))
+    first = self.client.get(url)['ETag']
+    second = self.client.get(url, {'before': list_cursor(list_)})['ETag']
+    self.assertNotEqual(first, second)
+
+  def create_lists(self, owner, n_lists):
+    lists = [List.objects.create(owner=owner) for _ in range(n_lists)]
+    # The 3rd and 4th lists share a timestamp, so with pages of two the
+    # first page ends in the middle of a tie.
+    if n_lists > 3:
+      List.objects.filter(id__in=[lists[2].id, lists[3].id]).update(
+        modified=lists[2].modified
+      )
+    return lists
+
+  def list_links(self, response):
+    parsed = lxml.html.fromstring(response.content)
+    return [a.get('href') for a in parsed.cssselect('ul li a')]
+
+  def test_lists_are_sorted_by_most_recent_activity(self):
+    owner = User.objects.create(email='a@b.com')
+    older, newer = self.create_lists(owner, 2)
+    Item.objects.create(list=older, text='new item')
+    response = self.client.get(reverse('my_lists', args=('a@b.com',)))
+    self.assertEqual(
+      self.list_links(response),
+      [older.get_absolute_url(), newer.get_absolute_url()],
+    )
+    self.assertContains(response, '1 item,')
+
+  @override_settings(MY_LISTS_PAGE_SIZE=2)
+  def test_load_more_pages_through_every_list_once(self):
+    owner = User.objects.create(email='a@b.com')
+    lists = self.create_lists(owner, 5)
+    url = reverse('my_lists', args=('a@b.com',))
+    query = ''
+    seen = []
+    while query is not None:
+      response = self.client.get(url + query)
+      seen += self.list_links(response)
+      more = lxml.html.fromstring(response.content).cssselect('#id_load_more')
+      query = more[0].get('href') if more else None
+    self.assertEqual(
+      sorted(seen), sorted(list_.get_absolute_url() for list_ in lists)
+    )
+    self.assertEqual(len(seen), 5)
+
+  def test_invalid_cursor_shows_first_page(self):
+    owner = User.objects.create(email='a@b.com')
+    self.create_lists(owner, 1)
+    response = self.client.get(
+      reverse('my_lists', args=('a@b.com',)), {'before': 'bad'}
+    )
+    self.assertEqual(len(self.list_links(response)), 1)
+
+  def test_out_of_range_cursor_shows_first_page(self):
+    owner = User.objects.create(email='a@b.com')
+    self.create_lists(owner, 1)
+    response = self.client.get(
+      reverse('my_lists', args=('a@b.com',)),
+      {'before': '99999999999999999999_1'},
+    )
+    self.assertEqual(len(self.list_links(response)), 1)
+
+  def test_own_page_reuses_the_logged_in_user(self):
+    owner = User.objects.create(email='a@b.com')
+    self.client.force_login(owner)
+    url = reverse('my_lists', args=('a@b.com',))
+    self.client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+      self.client.get(url)
+    self.assertFalse(
+      [q for q in queries if 'FROM "accounts_user"' in q['sql']]
+    )
  
 
+class SearchViewTest(TestCase):
+
+  def test_redirects_anonymous_users_home(self):
+    response = self.client.get(reverse('search'), {'q': 'milk'})
+    self.assertRedirects(response, '/')
+
+  def test_shows_matching_items_with_links_to_their_lists(self):
+    user = User.objects.create(email='a@b.com')
+    current_list = List.objects.create(owner=user)
+    Item.objects.create(list=current_list, text='oat milk')
+    self.client.force_login(user)
+    response = self.client.get(reverse('search'), {'q': 'milk'})
+    self.assertTemplateUsed(response, 'search.html')
+    parsed = lxml.html.fromstring(response.content)
+    [link] = parsed.cssselect('#id_search_results a')
+    self.assertEqual(link.text_content(), 'oat milk')
+    self.assertEqual(link.get('href'), f'/lists/{current_list.id}/')
+
+  def test_huge_page_number_shows_no_results(self):
+    user = User.objects.create(email='a@b.com')
+    Item.objects.create(list=List.objects.create(owner=user), text='milk')
+    self.client.force_login(user)
+    response = self.client.get(
+      reverse('search'), {'q': 'milk', 'page': '99999999999999999999'}
+    )
+    self.assertEqual(response.status_code, 200)
+    parsed = lxml.html.fromstring(response.content)
+    self.assertEqual(parsed.cssselect('#id_search_results a'), [])
+
+
+class AutocompleteViewTest(TestCase):
+
+  def test_returns_suggestions_for_logged_in_user(self):
+    user = User.objects.create(email='a@b.com')
+    Item.objects.create(list=List.objects.create(owner=user), text='milk')
+    self.client.force_login(user)
+    response = self.client.get(reverse('autocomplete'), {'q': 'mi'})
+    self.assertEqual(response.json(), {'suggestions': ['milk']})
+
+  def test_anonymous_users_get_no_suggestions(self):
+    Item.objects.create(list=List.objects.create(), text='milk')
+    response = self.client.get(reverse('autocomplete'), {'q': 'mi'})
+    self.assertEqual(response.json(), {'suggestions': []})
+
+
 class ListViewTest(TestCase):
 
   def post_empty_item(self):
@@ -133,6 +294,58 @@ class ListViewTest(TestCase):
     self.assertEqual(len(inputs), 1)
     self.assertIn('is-invalid', set(inputs[0].classes))
 
+  def test_unchanged_list_is_not_modified(self):
+    mylist = List.objects.create()
+    Item.objects.create(list=mylist, text='itemey')
+    self.client.get(f'/lists/{mylist.id}/')  # sets the CSRF cookie
+    response = self.client.get(f'/lists/{mylist.id}/')
+    self.assertIn('private', response['Cache-Control'])
+    with self.assertNumQueries(1):
+      response = self.client.get(
+        f'/lists/{mylist.id}/', headers={'If-None-Match': response['ETag']}
+      )
+    self.assertEqual(response.status_code, 304)
+    self.assertEqual(response.content, b'')
+
+  def test_adding_an_item_changes_etag(self):
+    mylist = List.objects.create()
+    etag = self.client.get(f'/lists/{mylist.id}/')['ETag']
+    self.client.post(f'/lists/{mylist.id}/', data={'text': 'new item'})
+    response = self.client.get(
+      f'/lists/{mylist.id}/', headers={'If-None-Match': etag}
+    )
+    self.assertContains(response, 'new item')
+
+  def test_etag_depends_on_logged_in_user(self):
+    mylist = List.objects.create()
+    etag = self.client.get(f'/lists/{mylist.id}/')['ETag']
+    self.client.force_login(User.objects.create(email='a@b.com'))
+    response = self.client.get(
+      f'/lists/{mylist.id}/', headers={'If-None-Match': etag}
+    )
+    self.assertContains(response, 'a@b.com')
+
+  def test_etag_depends_on_csrf_cookie(self):
+    mylist = List.objects.create()
+    etag = self.client.get(f'/lists/{mylist.id}/')['ETag']
+    self.client.cookies['csrftoken'] = 'x' * 32
+    response = self.client.get(
+      f'/lists/{mylist.id}/', headers={'If-None-Match': etag}
+    )
+    self.assertEqual(response.status_code, 200)
+
+  def test_pending_messages_are_never_not_modified(self):
+    mylist = List.objects.create()
+    response = self.client.post(
+      f'/lists/{mylist.id}/import', data={'items': 'imported'}, follow=True
+    )
+    self.assertContains(response, 'Added 1 items.')
+    self.assertNotIn('ETag', response)
+
+  def test_form_errors_are_not_cached(self):
+    response = self.post_empty_item()
+    self.assertNotIn('ETag', response)
+
   def test_duplicate_item_validation_errors_end_up_on_lists_page(self):
     list1 = List.objects.create()
     Item.objects.create(list=list1, text='textey')
@@ -148,6 +361,155 @@ class ListViewTest(TestCase):
     self.assertEqual(Item.objects.count(), 1)
 
 
+@override_settings(LIST_PAGE_SIZE=2, LIST_STREAM_CHUNK_SIZE=2)
+class LargeListViewTest(TestCase):
+
+  def create_list(self, n_items):
+    current_list = List.objects.create()
+    for n in range(1, n_items + 1):
+      Item.objects.create(list=current_list, text=f'item {n}')
+    return current_list
+
+  def rows(self, content):
+    parsed = lxml.html.fromstring(content)
+    rows = parsed.cssselect('#id_list_table tr')
+    return [row.text_content() for row in rows]
+
+  def test_first_page_is_limited_to_page_size(self):
+    current_list = self.create_list(3)
+    response = self.client.get(f'/lists/{current_list.id}/')
+    self.assertEqual(self.rows(response.content), ['1: item 1', '2: item 2'])
+
+  def test_next_page_link_continues_numbering(self):
+    current_list = self.create_list(3)
+    response = self.client.get(f'/lists/{current_list.id}/')
+    parsed = lxml.html.fromstring(response.content)
+    [next_link] = parsed.cssselect('#id_next_page')
+
+    url = f'/lists/{current_list.id}/' + next_link.get('href')
+    response = self.client.get(url)
+    self.assertEqual(self.rows(response.content), ['3: item 3'])
+    self.assertNotContains(response, 'id_next_page')
+
+  def test_no_next_page_link_when_list_fits_in_a_page(self):
+    current_list = self.create_list(2)
+    response = self.client.get(f'/lists/{current_list.id}/')
+    self.assertNotContains(response, 'id_next_page')
+
+  def test_last_page_follows_new_items_from_its_last_row(self):
+    current_list = self.create_list(2)
+    last_item = current_list.item_set.last()
+    response = self.client.get(f'/lists/{current_list.id}/')
+    self.assertContains(response, f'/lists/{current_list.id}/events')
+    self.assertContains(response, f'let after = {last_item.id}')
+
+  def test_earlier_pages_do_not_follow_new_items(self):
+    current_list = self.create_list(3)
+    response = self.client.get(f'/lists/{current_list.id}/')
+    self.assertNotContains(response, f'/lists/{current_list.id}/events')
+
+  def test_invalid_cursor_shows_first_page(self):
+    current_list = self.create_list(1)
+    response = self.client.get(f'/lists/{current_list.id}/?after=bad')
+    self.assertEqual(self.rows(response.content), ['1: item 1'])
+
+  async def test_stream_mode_sends_every_item(self):
+    current_list = await sync_to_async(self.create_list)(5)
+    response = await self.async_client.get(f'/lists/{current_list.id}/?stream')
+    self.assertTrue(response.streaming)
+    content = b''.join([chunk async for chunk in response.streaming_content])
+    self.assertEqual(
+      self.rows(content),
+      [f'{n}: item {n}' for n in range(1, 6)]
+    )
+    self.assertIn(b'id-text', content)
+
+
+class ImportItemsTest(TestCase):
+
+  def test_adds_items_to_existing_list(self):
+    current_list = List.objects.create()
+    response = self.client.post(
+      f'/lists/{current_list.id}/import',
+      data={'items': 'milk\neggs'}
+    )
+    self.assertRedirects(response, f'/lists/{current_list.id}/')
+    self.assertEqual(
+      [item.text for item in current_list.item_set.all()],
+      ['milk', 'eggs']
+    )
+
+  def test_reports_skipped_items(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    response = self.client.post(
+      f'/lists/{current_list.id}/import',
+      data={'items': 'milk\neggs'},
+      follow=True
+    )
+    self.assertContains(response, 'Added 1 items.')
+    self.assertContains(response, 'Skipped items already in the list: milk')
+
+  def test_invalid_import_shows_error_on_list_page(self):
+    current_list = List.objects.create()
+    response = self.client.post(
+      f'/lists/{current_list.id}/import',
+      data={'items': ''}
+    )
+    self.assertTemplateUsed(response, 'list.html')
+    self.assertContains(response, html.escape(EMPTY_IMPORT_ERROR))
+
+  def test_json_import_returns_summary(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='milk')
+    response = self.client.post(
+      f'/lists/{current_list.id}/import',
+      data='{"items": ["milk", "eggs"]}',
+      content_type='application/json'
+    )
+    self.assertEqual(response.status_code, 201)
+    self.assertEqual(
+      response.json(),
+      {
+        'list': current_list.id,
+        'url': f'/lists/{current_list.id}/',
+        'added': 1,
+        'skipped': ['milk'],
+      }
+    )
+
+  def test_invalid_json_import_returns_errors(self):
+    current_list = List.objects.create()
+    response = self.client.post(
+      f'/lists/{current_list.id}/import',
+      data='[1, 2]',
+      content_type='application/json'
+    )
+    self.assertEqual(response.status_code, 400)
+    self.assertEqual(response.json(), {'errors': [INVALID_IMPORT_ERROR]})
+
+  def test_import_to_new_list_creates_list(self):
+    response = self.client.post('/lists/import', data={'items': 'a\nb'})
+    new_list = List.objects.get()
+    self.assertRedirects(response, f'/lists/{new_list.id}/')
+    self.assertEqual(new_list.item_count, 2)
+
+  def test_import_to_new_list_saves_owner(self):
+    user = User.objects.create(email='a@b.com')
+    self.client.force_login(user)
+    self.client.post('/lists/import', data={'items': 'a'})
+    self.assertEqual(List.objects.get().owner, user)
+
+  def test_invalid_import_to_new_list_creates_nothing(self):
+    response = self.client.post('/lists/import', data={'items': ''})
+    self.assertTemplateUsed(response, 'home.html')
+    self.assertFalse(List.objects.exists())
+
+  def test_GET_is_not_allowed(self):
+    response = self.client.get('/lists/import')
+    self.assertEqual(response.status_code, 405)
+
+
 class NewListTest(TestCase):
 
   def post_emtpy_item(self):
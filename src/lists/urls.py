@@ -3,6 +3,12 @@ from lists import views
 
 urlpatterns = [
     path('<int:list_id>/', views.view_list, name='view_list'),
+    path('<int:list_id>/import', views.import_items, name='import_items'),
+    path('<int:list_id>/events', views.list_events, name='list_events'),
+    path('<int:list_id>/poll', views.poll_list, name='poll_list'),
     path('new', views.new_list, name='new_list'),
+    path('import', views.import_new_list, name='import_new_list'),
     path('users/<str:email>/', views.my_lists, name='my_lists'),
+    path('search', views.search, name='search'),
+    path('autocomplete', views.autocomplete, name='autocomplete'),
 ]
@@ -1,38 +1,374 @@
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from hashlib import blake2b
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
 from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Max
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.safestring import mark_safe
+from django.views.decorators.http import require_POST
 
 from accounts.models import User
-from lists.forms import ExistingListItemForm, ItemForm
+from lists import live
+from lists.autocomplete import suggest
+from lists.cache import render_item_page
+from lists.forms import BulkItemForm, ExistingListItemForm, ItemForm
 from lists.models import Item, List
+from lists.search import search_items
+from superlists.db import arun_write, write_transaction
+
+STREAM_MARKER = mark_safe('<!-- item rows -->')
+MAX_SKIPPED_SHOWN = 10
+# Keeps the search OFFSET well inside SQLite's 64-bit INTEGER range.
+MAX_SEARCH_PAGE = 1000
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
-def home_page(request):
+async def home_page(request):
   return render(request, 'home.html', {'form': ItemForm()})
 
-def my_lists(request, email):
-  owner = User.objects.get(email=email)
-  return render(request, 'my_lists.html', {'owner': owner})
+async def my_lists(request, email):
+  if request.user.is_authenticated and request.user.email == email:
+    owner = request.user
+  else:
+    owner = await User.objects.aget(email=email)
+  stamp = await List.objects.filter(owner=owner).aaggregate(
+    modified=Max('modified'), count=Count('id')
+  )
+  etag = page_etag(request, owner.pk, stamp['modified'], stamp['count'])
+  not_modified = etag and get_conditional_response(request, etag=etag)
+  if not_modified:
+    return not_modified
+  lists, last = await sync_to_async(List.owner_page)(
+    owner,
+    parse_list_cursor(request.GET.get('before')),
+    settings.MY_LISTS_PAGE_SIZE,
+  )
+  response = render(request, 'my_lists.html', {
+    'owner': owner,
+    'lists': lists,
+    'next_cursor': list_cursor(last) if last else None,
+  })
+  return with_etag(response, etag)
 
-def view_list(request, list_id):
-  current_list = List.objects.get(id=list_id)
+def search(request):
+  if not request.user.is_authenticated:
+    return redirect('home')
+  query = request.GET.get('q', '')
+  page = min(
+    max(parse_cursor(request.GET.get('page')), 1), MAX_SEARCH_PAGE
+  )
+  results, has_next = search_items(
+    request.user, query, page, settings.SEARCH_PAGE_SIZE
+  )
+  return render(request, 'search.html', {
+    'query': query,
+    'results': results,
+    'page': page,
+    'has_next': has_next,
+  })
+
+def autocomplete(request):
+  suggestions = []
+  if request.user.is_authenticated:
+    suggestions = suggest(
+      request.user, request.GET.get('q', ''), settings.AUTOCOMPLETE_LIMIT
+    )
+  return JsonResponse({'suggestions': suggestions})
+
+async def view_list(request, list_id):
+  current_list = await List.objects.aget(id=list_id)
   form = ExistingListItemForm(for_list=current_list)
 
   if request.method == 'POST':
     form = ExistingListItemForm(for_list=current_list, data=request.POST)
-    if form.is_valid():
-      form.save()
+    if await arun_write(_save_item, form):
       return redirect(current_list)
- 
-  return render(request, 'list.html', {'list': current_list, 'form': form})
 
-def new_list(request):
+  etag = page_etag(
+    request, current_list.id, current_list.version, current_list.modified
+  )
+  not_modified = etag and get_conditional_response(request, etag=etag)
+  if not_modified:
+    return not_modified
+
+  if 'stream' in request.GET:
+    return with_etag(_stream_list(request, current_list, form), etag)
+
+  context = {'list': current_list, 'form': form}
+  after = parse_cursor(request.GET.get('after'))
+  context.update(await sync_to_async(render_item_page)(current_list, after))
+  return with_etag(render(request, 'list.html', context), etag)
+
+def _save_item(form):
+  return form.is_valid() and form.save()
+
+# Pushes the items added to a list as Server-Sent Events, each carrying
+# the rows to append and, as its id, the last item it holds. Browsers
+# reconnect with that id in Last-Event-ID, which is also how a stream
+# that reached LIST_EVENTS_MAX_AGE picks up where it left off.
+async def list_events(request, list_id):
+  current_list = await List.objects.aget(id=list_id)
+  after = parse_cursor(
+    request.headers.get('Last-Event-ID', request.GET.get('after'))
+  )
+  subscription = live.events.subscribe(current_list.id, current_list.version)
+  if subscription is None:
+    response = HttpResponse(status=503)
+    response['Retry-After'] = settings.LIST_EVENTS_RETRY
+    return response
+  response = StreamingHttpResponse(
+    _event_stream(subscription, current_list, after),
+    content_type='text/event-stream',
+  )
+  response['Cache-Control'] = 'no-cache'
+  # Stops nginx from buffering the stream.
+  response['X-Accel-Buffering'] = 'no'
+  return response
+
+async def _event_stream(subscription, current_list, after):
+  loop = asyncio.get_running_loop()
+  deadline = loop.time() + settings.LIST_EVENTS_MAX_AGE
+  offset = None
+  changed = True
+  try:
+    yield f'retry: {settings.LIST_EVENTS_RETRY * 1000}\n\n'
+    while True:
+      if changed:
+        rows, after, offset, more = await _rows_after(
+          current_list, after, offset
+        )
+        if rows:
+          yield _event('items', after, rows)
+        if more:
+          continue
+      remaining = deadline - loop.time()
+      if remaining <= 0:
+        return
+      changed = await subscription.wait(
+        min(settings.LIST_EVENTS_HEARTBEAT, remaining)
+      )
+      if not changed:
+        yield ': keep-alive\n\n'
+  finally:
+    subscription.close()
+
+def _event(name, id_, data):
+  lines = [f'event: {name}', f'id: {id_}']
+  lines += [
+    f'data: {line.strip()}' for line in data.splitlines() if line.strip()
+  ]
+  return '\n'.join(lines) + '\n\n'
+
+# The fallback for browsers without EventSource and for workers with no
+# streams to spare: answers with the rows after `after` once there are
+# any, or with none after LIST_EVENTS_POLL_TIMEOUT. A full worker answers
+# at once, with a Retry-After. Like the event stream, the wait happens
+# while the response streams, so an idle poll ties up no thread.
+async def poll_list(request, list_id):
+  current_list = await List.objects.aget(id=list_id)
+  after = parse_cursor(request.GET.get('after'))
+  subscription = live.events.subscribe(current_list.id, current_list.version)
+  if subscription is None:
+    response = JsonResponse(await _poll_data(current_list, after))
+    response['Retry-After'] = settings.LIST_EVENTS_RETRY
+    return response
+  response = StreamingHttpResponse(
+    _poll_stream(subscription, current_list, after),
+    content_type='application/json',
+  )
+  response['Cache-Control'] = 'no-cache'
+  return response
+
+async def _poll_stream(subscription, current_list, after):
+  try:
+    data = await _poll_data(current_list, after)
+    if not data['rows'] and await subscription.wait(
+      settings.LIST_EVENTS_POLL_TIMEOUT
+    ):
+      data = await _poll_data(current_list, after)
+  finally:
+    subscription.close()
+  yield json.dumps(data)
+
+async def _poll_data(current_list, after):
+  rows, last, _, _ = await _rows_after(current_list, after)
+  return {'after': last, 'rows': rows}
+
+# Renders the next page of rows after the item `after`, numbered on from
+# `offset` (counted when not known yet).
+async def _rows_after(current_list, after, offset=None):
+  size = settings.LIST_PAGE_SIZE
+  items = [
+    item async for item in current_list.item_set.filter(id__gt=after)[:size]
+  ]
+  if not items:
+    return '', after, offset, False
+  if offset is None:
+    offset = await current_list.item_set.filter(id__lte=after).acount()
+  rows = render_to_string(
+    'includes/item_rows.html', {'items': items, 'offset': offset}
+  )
+  return rows, items[-1].id, offset + len(items), len(items) == size
+
+# Validates a page that shows `parts` to whoever made the request. Pages
+# also show the user, embed a token for their CSRF cookie and show the
+# flash messages waiting for them, so a page with messages (or a form
+# that failed to validate on POST) is never served from a cache.
+def page_etag(request, *parts):
+  if request.method not in ('GET', 'HEAD'):
+    return None
+  if len(messages.get_messages(request)):
+    return None
+  key = '|'.join(str(part) for part in (
+    *parts,
+    request.user.pk,
+    request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''),
+    request.GET.urlencode(),
+  ))
+  return f'W/"{blake2b(key.encode(), digest_size=12).hexdigest()}"'
+
+def with_etag(response, etag):
+  if etag:
+    response['ETag'] = etag
+    # Per user, so shared caches must not keep it, and browsers must
+    # revalidate rather than guess how long it stays fresh.
+    patch_cache_control(response, private=True, no_cache=True)
+  return response
+
+def parse_cursor(value):
+  try:
+    return max(int(value), 0)
+  except (TypeError, ValueError):
+    return 0
+
+# A page of lists ends at a (modified, id) pair, sent as "<microseconds
+# since the epoch>_<id>".
+def list_cursor(list_):
+  micros = (list_.modified - EPOCH) // timedelta(microseconds=1)
+  return f'{micros}_{list_.id}'
+
+def parse_list_cursor(value):
+  try:
+    micros, id_ = (int(part) for part in value.split('_'))
+    return EPOCH + timedelta(microseconds=micros), id_
+  except (AttributeError, ValueError, OverflowError):
+    return None
+
+def _stream_list(request, current_list, form):
+  page = render_to_string(
+    'list.html',
+    {'list': current_list, 'form': form, 'item_rows': STREAM_MARKER},
+    request=request,
+  )
+  head, tail = page.split(STREAM_MARKER, 1)
+  return StreamingHttpResponse(_stream_rows(current_list, head, tail))
+
+async def _stream_rows(current_list, head, tail):
+  yield head
+  chunk_size = settings.LIST_STREAM_CHUNK_SIZE
+  items = current_list.item_set.all().aiterator(chunk_size=chunk_size)
+  chunk = []
+  offset = 0
+  async for item in items:
+    chunk.append(item)
+    if len(chunk) == chunk_size:
+      yield render_to_string(
+        'includes/item_rows.html', {'items': chunk, 'offset': offset}
+      )
+      offset += len(chunk)
+      chunk = []
+  if chunk:
+    yield render_to_string(
+      'includes/item_rows.html', {'items': chunk, 'offset': offset}
+    )
+  yield tail
+
+async def new_list(request):
   form = ItemForm(data=request.POST)
-  if form.is_valid():
+  new_list = await arun_write(_create_list, form, request.user)
+  if new_list:
+    return redirect(new_list)
+  else:
+    return render(request, 'home.html', {'form': form})
+
+def _create_list(form, user):
+  if not form.is_valid():
+    return None
+  new_list = List.objects.create()
+  if user.is_authenticated:
+    new_list.owner = user
+    new_list.save()
+  form.save(for_list=new_list)
+  return new_list
+
+@require_POST
+@write_transaction
+def import_items(request, list_id):
+  current_list = List.objects.get(id=list_id)
+  form = BulkItemForm(data=_import_data(request))
+  if not form.is_valid():
+    if _wants_json(request):
+      return JsonResponse({'errors': form.errors['items']}, status=400)
+    context = {
+      'list': current_list,
+      'form': ExistingListItemForm(for_list=current_list),
+      'import_form': form,
+    }
+    context.update(render_item_page(current_list, 0))
+    return render(request, 'list.html', context)
+  new_items, skipped = form.save(for_list=current_list)
+  return _import_response(request, current_list, new_items, skipped)
+
+@require_POST
+@write_transaction
+def import_new_list(request):
+  form = BulkItemForm(data=_import_data(request))
+  if not form.is_valid():
+    if _wants_json(request):
+      return JsonResponse({'errors': form.errors['items']}, status=400)
+    return render(
+      request, 'home.html', {'form': ItemForm(), 'import_form': form}
+    )
+  with transaction.atomic():
     new_list = List.objects.create()
     if request.user.is_authenticated:
       new_list.owner = request.user
       new_list.save()
-    form.save(for_list=new_list)
-    return redirect(new_list)
-  else:
-    return render(request, 'home.html', {'form': form})
+    new_items, skipped = form.save(for_list=new_list)
+  return _import_response(request, new_list, new_items, skipped)
+
+def _wants_json(request):
+  return request.content_type == 'application/json'
+
+def _import_data(request):
+  if _wants_json(request):
+    return {'items': request.body.decode()}
+  return request.POST
 
+def _import_response(request, current_list, new_items, skipped):
+  if _wants_json(request):
+    return JsonResponse(
+      {
+        'list': current_list.id,
+        'url': current_list.get_absolute_url(),
+        'added': len(new_items),
+        'skipped': skipped,
+      },
+      status=201,
+    )
+  messages.success(request, f'Added {len(new_items)} items.')
+  if skipped:
+    shown = ', '.join(skipped[:MAX_SKIPPED_SHOWN])
+    more = len(skipped) - MAX_SKIPPED_SHOWN
+    if more > 0:
+      shown += f' and {more} more'
+    messages.warning(request, f'Skipped items already in the list: {shown}')
+  return redirect(current_list)
@@ -0,0 +1,166 @@
+import asyncio
+import functools
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_DELAY = 0.05
+LOCK_RETRY_MAX_DELAY = 1.0
+
+def is_locked_error(error):
+  return 'database is locked' in str(error)
+
+# Runs func in one transaction, retrying with bounded, jittered backoff
+# while SQLite reports the database as locked. Retrying is only safe
+# because the whole transaction is rolled back first.
+def retrying_transaction(func):
+  @functools.wraps(func)
+  def wrapper(*args, **kwargs):
+    delay = LOCK_RETRY_DELAY
+    for attempt in range(1, LOCK_RETRY_ATTEMPTS + 1):
+      try:
+        with transaction.atomic():
+          return func(*args, **kwargs)
+      except OperationalError as e:
+        if attempt == LOCK_RETRY_ATTEMPTS or not is_locked_error(e):
+          raise
+      time.sleep(random.uniform(0, delay))
+      delay = min(delay * 2, LOCK_RETRY_MAX_DELAY)
+
+  return wrapper
+
+# Runs the whole view in a retrying_transaction for the given methods.
+def write_transaction(view=None, *, methods=('POST',)):
+  if view is None:
+    return functools.partial(write_transaction, methods=methods)
+
+  transactional_view = retrying_transaction(view)
+
+  @functools.wraps(view)
+  def wrapper(request, *args, **kwargs):
+    if request.method not in methods:
+      return view(request, *args, **kwargs)
+    return transactional_view(request, *args, **kwargs)
+
+  return wrapper
+
+
+# Group commit: functions submitted from any thread are run one after
+# another by a single writer thread, which gathers whatever arrives within
+# `window` seconds (up to max_batch) into one transaction. Each function
+# gets its own savepoint, so one failing only rolls back its own writes and
+# its caller gets the error; the others still commit together.
+class WriteCoalescer:
+  def __init__(self, window, max_batch):
+    self.window = window
+    self.max_batch = max_batch
+    self.commits = 0
+    self._jobs = queue.SimpleQueue()
+    self._thread = None
+    self._lock = threading.Lock()
+
+  def submit(self, func, *args):
+    future = Future()
+    self._jobs.put((future, func, args))
+    with self._lock:
+      # Also restarts the thread in a worker forked after it started.
+      if self._thread is None or not self._thread.is_alive():
+        self._thread = threading.Thread(
+          target=self._run, name='write-coalescer', daemon=True
+        )
+        self._thread.start()
+    return future
+
+  def stop(self):
+    with self._lock:
+      thread = self._thread
+      self._thread = None
+    if thread is not None:
+      self._jobs.put(None)
+      thread.join()
+
+  def _run(self):
+    try:
+      while True:
+        batch = self._gather()
+        if batch is None:
+          return
+        self._commit(batch)
+    finally:
+      connection.close()
+
+  def _gather(self):
+    job = self._jobs.get()
+    if job is None:
+      return None
+    batch = [job]
+    deadline = time.monotonic() + self.window
+    while len(batch) < self.max_batch:
+      try:
+        job = self._jobs.get(timeout=max(deadline - time.monotonic(), 0))
+      except queue.Empty:
+        break
+      if job is None:
+        # Finish this batch, then stop.
+        self._jobs.put(None)
+        break
+      batch.append(job)
+    return batch
+
+  def _commit(self, batch):
+    try:
+      results = retrying_transaction(self._apply)(batch)
+    except Exception as e:
+      connection.close()
+      for future, _, _ in batch:
+        future.set_exception(e)
+      return
+    self.commits += 1
+    for (future, _, _), (result, error) in zip(batch, results):
+      if error is None:
+        future.set_result(result)
+      else:
+        future.set_exception(error)
+
+  def _apply(self, batch):
+    results = []
+    for _, func, args in batch:
+      try:
+        with transaction.atomic():
+          results.append((func(*args), None))
+      except OperationalError as e:
+        # Waiting for the lock again is up to retrying_transaction, for the
+        # whole batch.
+        if is_locked_error(e):
+          raise
+        results.append((None, e))
+      except Exception as e:
+        results.append((None, e))
+    return results
+
+
+_coalescer = None
+_coalescer_lock = threading.Lock()
+
+def coalescer():
+  global _coalescer
+  with _coalescer_lock:
+    if _coalescer is None:
+      _coalescer = WriteCoalescer(
+        settings.WRITE_COALESCING_WINDOW, settings.WRITE_COALESCING_MAX_BATCH
+      )
+    return _coalescer
+
+# Runs func in a transaction of its own, or, with WRITE_COALESCING on, in
+# the next group commit.
+async def arun_write(func, *args):
+  if settings.WRITE_COALESCING:
+    return await asyncio.wrap_future(coalescer().submit(func, *args))
+  return await sync_to_async(retrying_transaction(func))(*args)
@@ -0,0 +1,270 @@
+import atexit
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_in
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from accounts.models import Token
+from lists.models import List
+from lists.signals import items_added
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+METRICS = {
+  'superlists_request_duration_seconds': (
+    'histogram', 'Time to handle a request, by URL name.'
+  ),
+  'superlists_responses_total': (
+    'counter', 'Responses sent, by URL name and status code.'
+  ),
+  'superlists_lists_created_total': ('counter', 'Lists created.'),
+  'superlists_items_added_total': ('counter', 'Items added to lists.'),
+  'superlists_duplicate_items_total': (
+    'counter', 'Items rejected because the list already had them.'
+  ),
+  'superlists_login_tokens_issued_total': (
+    'counter', 'Login tokens emailed.'
+  ),
+  'superlists_logins_total': ('counter', 'Successful logins.'),
+}
+
+# Counters and histograms of one process. Each gunicorn worker writes its
+# own to a file in METRICS_DIR, and /metrics adds up all the files.
+class Registry:
+  def __init__(self):
+    self.counters = {}
+    self.histograms = {}
+    self._lock = threading.Lock()
+
+  def inc(self, name, amount=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with self._lock:
+      self.counters[key] = self.counters.get(key, 0) + amount
+
+  def observe(self, name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with self._lock:
+      histogram = self.histograms.get(key)
+      if histogram is None:
+        histogram = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        self.histograms[key] = histogram
+      histogram[0][bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+      histogram[1] += value
+      histogram[2] += 1
+
+  def snapshot(self):
+    with self._lock:
+      return {
+        'counters': [
+          [name, dict(labels), value]
+          for (name, labels), value in self.counters.items()
+        ],
+        'histograms': [
+          [name, dict(labels), list(buckets), total, count]
+          for (name, labels), (buckets, total, count)
+          in self.histograms.items()
+        ],
+      }
+
+  def merge(self, snapshot):
+    for name, labels, value in snapshot['counters']:
+      self.inc(name, value, **labels)
+    with self._lock:
+      for name, labels, buckets, total, count in snapshot['histograms']:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self.histograms.setdefault(
+          key, [[0] * len(buckets), 0.0, 0]
+        )
+        histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+        histogram[1] += total
+        histogram[2] += count
+
+  def render(self):
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+      lines.append(f'# HELP {name} {help_text}')
+      lines.append(f'# TYPE {name} {kind}')
+      if kind == 'counter':
+        for (metric, labels), value in sorted(self.counters.items()):
+          if metric == name:
+            lines.append(f'{name}{format_labels(labels)} {value}')
+        continue
+      for (metric, labels), (buckets, total, count) in sorted(
+        self.histograms.items()
+      ):
+        if metric != name:
+          continue
+        cumulative = 0
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        for bound, bucket in zip(bounds, buckets):
+          cumulative += bucket
+          bucket_labels = format_labels(labels + (('le', bound),))
+          lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {total}')
+        lines.append(f'{name}_count{format_labels(labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+  if not labels:
+    return ''
+  pairs = ','.join(
+    f'{key}="{escape_label(value)}"' for key, value in labels
+  )
+  return f'{{{pairs}}}'
+
+def escape_label(value):
+  return (
+    str(value)
+    .replace('\\', '\\\\')
+    .replace('"', '\\"')
+    .replace('\n', '\\n')
+  )
+
+
+registry = Registry()
+for name, (kind, _) in METRICS.items():
+  if kind == 'counter' and name != 'superlists_responses_total':
+    registry.inc(name, 0)
+
+_flush_lock = threading.Lock()
+_file_path = None
+_file_key = None
+_flusher = None
+_flusher_lock = threading.Lock()
+
+def _process_file():
+  global _file_path, _file_key
+  # Workers forked from a preloaded master must not share its file.
+  key = (os.getpid(), settings.METRICS_DIR)
+  if _file_key != key:
+    _file_key = key
+    _file_path = os.path.join(
+      settings.METRICS_DIR, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json'
+    )
+  return _file_path
+
+def flush():
+  if not settings.METRICS_DIR:
+    return
+  with _flush_lock:
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    path = _process_file()
+    with open(f'{path}.tmp', 'w') as f:
+      json.dump(registry.snapshot(), f)
+    os.replace(f'{path}.tmp', path)
+
+# The file is written every METRICS_FLUSH_INTERVAL by a thread of its own,
+# so requests, and the event loop under ASGI, never wait on the disk. A
+# worker forked after the thread started gets a thread of its own.
+def start_flusher():
+  global _flusher
+  if not settings.METRICS_DIR:
+    return
+  with _flusher_lock:
+    if _flusher is None or not _flusher.is_alive():
+      _flusher = threading.Thread(
+        target=_flush_every_interval, name='metrics-flush', daemon=True
+      )
+      _flusher.start()
+
+def _flush_every_interval():
+  while True:
+    time.sleep(settings.METRICS_FLUSH_INTERVAL)
+    flush()
+
+# Management commands import this module too; only write a file for a
+# process that counted something.
+@atexit.register
+def _flush_at_exit():
+  if registry.histograms or any(registry.counters.values()):
+    flush()
+
+def collect():
+  if not settings.METRICS_DIR:
+    return registry
+  flush()
+  merged = Registry()
+  for name in os.listdir(settings.METRICS_DIR):
+    if not name.endswith('.json'):
+      continue
+    path = os.path.join(settings.METRICS_DIR, name)
+    # The counts of a worker that has exited go with it; Prometheus takes
+    # the drop as a counter reset.
+    if not _is_running(name.split('-', 1)[0]):
+      try:
+        os.remove(path)
+      except OSError:
+        pass
+      continue
+    try:
+      with open(path) as f:
+        merged.merge(json.load(f))
+    except (OSError, ValueError):
+      continue
+  return merged
+
+def _is_running(pid):
+  try:
+    os.kill(int(pid), 0)
+  except (ValueError, ProcessLookupError):
+    return False
+  except PermissionError:
+    pass
+  return True
+
+def observe_request(view, status, seconds):
+  view = view or 'unmatched'
+  registry.observe(
+    'superlists_request_duration_seconds', seconds, view=view
+  )
+  registry.inc('superlists_responses_total', view=view, status=status)
+  start_flusher()
+
+def metrics_view(request):
+  token = settings.METRICS_TOKEN
+  # In production the counters are only served with a token.
+  if not token and not settings.DEBUG:
+    return HttpResponseForbidden()
+  if token and not constant_time_compare(
+    request.headers.get('Authorization', ''), f'Bearer {token}'
+  ):
+    return HttpResponseForbidden()
+  return HttpResponse(
+    collect().render(),
+    content_type='text/plain; version=0.0.4; charset=utf-8',
+  )
+
+
+# Writes are counted once they commit, so a rolled back transaction counts
+# nothing and one that is retried counts once.
+def inc_on_commit(name, amount=1, **labels):
+  transaction.on_commit(lambda: registry.inc(name, amount, **labels))
+
+@receiver(post_save, sender=List)
+def count_new_list(sender, created, **kwargs):
+  if created:
+    inc_on_commit('superlists_lists_created_total')
+
+@receiver(items_added)
+def count_new_items(sender, items, **kwargs):
+  inc_on_commit('superlists_items_added_total', len(items))
+
+@receiver(post_save, sender=Token)
+def count_new_token(sender, created, **kwargs):
+  if created:
+    inc_on_commit('superlists_login_tokens_issued_total')
+
+@receiver(user_logged_in)
+def count_login(sender, **kwargs):
+  registry.inc('superlists_logins_total')
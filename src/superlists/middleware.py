@@ -0,0 +1,103 @@
+import json
+import logging
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib import auth
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+from superlists import metrics, timing
+
+logger = logging.getLogger('superlists.requests')
+
+# Loads request.user before the view runs. The lazy user set by
+# AuthenticationMiddleware queries the database on first use, which
+# async views and the templates they render must not do. Sessions logged
+# in before users had integer ids hold an email as the user id, which
+# Django fails to convert, so they are emptied first.
+@sync_and_async_middleware
+def resolve_user_middleware(get_response):
+  if iscoroutinefunction(get_response):
+    async def middleware(request):
+      if _is_old_user_id(await request.session.aget(auth.SESSION_KEY)):
+        await request.session.aflush()
+      request.user = await request.auser()
+      return await get_response(request)
+
+  else:
+    def middleware(request):
+      if _is_old_user_id(request.session.get(auth.SESSION_KEY)):
+        request.session.flush()
+      request.user = auth.get_user(request)
+      return get_response(request)
+
+  return middleware
+
+def _is_old_user_id(user_id):
+  return user_id is not None and not str(user_id).isdigit()
+
+
+# Counts the SQL queries and times the database, template rendering and
+# the whole request. The results go in a Server-Timing header and one
+# JSON log line per request, logged as a warning when over budget, and
+# feed the per-view latency metrics.
+@sync_and_async_middleware
+def request_timing_middleware(get_response):
+  if iscoroutinefunction(get_response):
+    async def middleware(request):
+      timings = timing.RequestTimings()
+      token = timing.current.set(timings)
+      try:
+        response = await get_response(request)
+      finally:
+        timing.current.reset(token)
+      _report(request, response, timings)
+      return response
+
+  else:
+    def middleware(request):
+      # Connections opened before this module was imported, e.g. the
+      # one a test runs in, missed the connection_created signal.
+      for connection in connections.all(initialized_only=True):
+        timing.instrument(connection)
+      timings = timing.RequestTimings()
+      token = timing.current.set(timings)
+      try:
+        response = get_response(request)
+      finally:
+        timing.current.reset(token)
+      _report(request, response, timings)
+      return response
+
+  return middleware
+
+def _report(request, response, timings):
+  record = {
+    'method': request.method,
+    'path': request.path,
+    'view': getattr(request.resolver_match, 'view_name', None),
+    'status': response.status_code,
+    'queries': timings.queries,
+    'db_ms': round(timings.db * 1000, 2),
+    'template_ms': round(timings.template * 1000, 2),
+    'total_ms': round(timings.elapsed() * 1000, 2),
+  }
+  response['Server-Timing'] = (
+    f'db;dur={record["db_ms"]};desc="{timings.queries} queries", '
+    f'template;dur={record["template_ms"]}, '
+    f'total;dur={record["total_ms"]}'
+  )
+  metrics.observe_request(
+    record['view'], response.status_code, timings.elapsed()
+  )
+  over_budget = [
+    name for name, budget in settings.REQUEST_BUDGETS.items()
+    if record[name] > budget
+  ]
+  level = logging.INFO
+  if over_budget:
+    record['over_budget'] = over_budget
+    level = logging.WARNING
+  if logger.isEnabledFor(level):
+    logger.log(level, json.dumps(record))
@@ -0,0 +1,50 @@
+import contextvars
+
+from asgiref.sync import iscoroutinefunction
+from django.db import connections
+from django.utils.decorators import sync_and_async_middleware
+
+# Set once the current request (or management command) has written, so
+# that it keeps reading its own writes from the writer connection.
+_has_written = contextvars.ContextVar('has_written', default=False)
+
+# Reads go to the read-only 'reader' connection and writes to the single
+# 'default' writer. After a write, or inside a transaction on the writer,
+# reads stay on the writer so they see the rows just written.
+class ReadWriteRouter:
+
+  def db_for_read(self, model, **hints):
+    if _has_written.get() or connections['default'].in_atomic_block:
+      return 'default'
+    return 'reader'
+
+  def db_for_write(self, model, **hints):
+    _has_written.set(True)
+    return 'default'
+
+  def allow_relation(self, obj1, obj2, **hints):
+    return True
+
+  def allow_migrate(self, db, app_label, model_name=None, **hints):
+    return db == 'default'
+
+
+@sync_and_async_middleware
+def read_your_writes_middleware(get_response):
+  if iscoroutinefunction(get_response):
+    async def middleware(request):
+      token = _has_written.set(False)
+      try:
+        return await get_response(request)
+      finally:
+        _has_written.reset(token)
+
+  else:
+    def middleware(request):
+      token = _has_written.set(False)
+      try:
+        return get_response(request)
+      finally:
+        _has_written.reset(token)
+
+  return middleware
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os, sys
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -40,17 +41,25 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'accounts',
-    'functional_tests',
     'lists',
 ]
 
+# functional_tests only adds test helpers, like the create_session command
+# that logs anyone in. Production leaves it out unless DJANGO_TEST_APPS is
+# set, which staging needs so the functional tests can drive it.
+if DEBUG or os.environ.get('DJANGO_TEST_APPS'):
+    INSTALLED_APPS.append('functional_tests')
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'superlists.middleware.request_timing_middleware',
+    'superlists.routers.read_your_writes_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'superlists.middleware.resolve_user_middleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -59,7 +68,7 @@ ROOT_URLCONF = 'superlists.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'superlists.timing.TimedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -78,14 +87,65 @@ WSGI_APPLICATION = 'superlists.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Under ASGI, sync ORM calls run on a new thread for every request, so
+# persistent connections would be left open per thread instead of reused.
+# Connections are closed after each request there, and superlists.sqlite_pool
+# keeps up to DATABASE_POOL_SIZE of them open for the next requests.
+
+ASGI = 'DJANGO_ASGI' in os.environ
+
+# WAL lets readers run alongside the single writer, and IMMEDIATE
+# transactions take the write lock up front instead of failing with
+# "database is locked" when a read lock can't be upgraded.
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'superlists.sqlite_pool',
         'NAME': BASE_DIR / 'db.sqlite3',
         'NAME': db_path,
+        'CONN_MAX_AGE': 0 if DEBUG or ASGI else None,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 5,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': (
+                'PRAGMA journal_mode=WAL;'
+                'PRAGMA synchronous=NORMAL;'
+                'PRAGMA mmap_size=134217728;'
+                'PRAGMA cache_size=-20000;'
+                'PRAGMA temp_store=MEMORY;'
+            ),
+        },
     }
 }
 
+DATABASE_POOL_SIZE = 8
+
+# Opt-in group commit: item and list inserts from the site's forms wait up
+# to WRITE_COALESCING_WINDOW seconds for others to share a transaction
+# with. See superlists.db.WriteCoalescer.
+
+WRITE_COALESCING = 'DJANGO_WRITE_COALESCING' in os.environ
+WRITE_COALESCING_WINDOW = float(
+    os.environ.get('DJANGO_WRITE_COALESCING_WINDOW', 0.005)
+)
+WRITE_COALESCING_MAX_BATCH = 64
+
+# In production, reads go through a separate read-only connection so page
+# loads never queue behind the writer. See superlists.routers.
+
+if not DEBUG:
+    DATABASES['reader'] = {
+        **DATABASES['default'],
+        'NAME': f'file:{db_path}?mode=ro',
+        'OPTIONS': {
+            **DATABASES['default']['OPTIONS'],
+            'transaction_mode': None,
+        },
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_ROUTERS = ['superlists.routers.ReadWriteRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -106,6 +166,20 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Sessions and messages
+# Production keeps sessions in signed cookies so requests don't read or
+# write the sessions table. DJANGO_SESSION_ENGINE can select another
+# engine, e.g. django.contrib.sessions.backends.cached_db.
+
+SESSION_ENGINE = os.environ.get(
+    'DJANGO_SESSION_ENGINE',
+    'django.contrib.sessions.backends.db' if DEBUG
+    else 'django.contrib.sessions.backends.signed_cookies',
+)
+
+MESSAGE_STORAGE = 'django.contrib.messages.storage.cookie.CookieStorage'
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
 
@@ -157,6 +231,32 @@ if "test" in sys.argv:
         "level": "WARNING",
         "propagate": False,
     }
+    LOGGING["loggers"]["superlists.requests"] = {
+        "handlers": ["null"],
+        "propagate": False,
+    }
+
+# Requests over any of these budgets are logged as warnings by
+# superlists.middleware.request_timing_middleware.
+REQUEST_BUDGETS = {
+    'queries': int(os.environ.get('DJANGO_QUERY_BUDGET', 20)),
+    'db_ms': float(os.environ.get('DJANGO_DB_MS_BUDGET', 100)),
+    'template_ms': float(os.environ.get('DJANGO_TEMPLATE_MS_BUDGET', 100)),
+    'total_ms': float(os.environ.get('DJANGO_TOTAL_MS_BUDGET', 300)),
+}
+
+# Metrics
+# Each worker process writes its metrics to a file in METRICS_DIR every
+# METRICS_FLUSH_INTERVAL seconds and /metrics adds them up. Without a
+# directory only the serving process is reported. /metrics requires
+# METRICS_TOKEN as a bearer token, and is refused without one unless DEBUG
+# is on.
+
+METRICS_DIR = os.environ.get(
+    'DJANGO_METRICS_DIR', None if DEBUG else '/tmp/superlists-metrics'
+)
+METRICS_FLUSH_INTERVAL = 1
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN')
 
 # Auth
 
@@ -164,6 +264,10 @@ AUTH_USER_MODEL = 'accounts.User'
 AUTHENTICATION_BACKENDS = [
   'accounts.authentication.PasswordlessAuthenticationBackend'
 ]
+LOGIN_TOKEN_MAX_AGE = timedelta(hours=1)
+# Per-process cache of users looked up on every authenticated request
+USER_CACHE_MAX_SIZE = 1024
+USER_CACHE_TTL = 60
 
 # Email
 
@@ -173,3 +277,50 @@ EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_PASSWORD')
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 
+# Caches
+# The lists cache holds rendered item tables. Point it at a shared backend
+# (e.g. django.core.cache.backends.redis.RedisCache) to share entries
+# between workers, or a file based one to keep them across restarts.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'lists': {
+        'BACKEND': os.environ.get(
+            'DJANGO_LIST_CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache',
+        ),
+        'LOCATION': os.environ.get('DJANGO_LIST_CACHE_LOCATION', 'lists'),
+        'TIMEOUT': 60 * 60,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+}
+
+# Lists
+
+LIST_CACHE_ALIAS = 'lists'
+
+LIST_PAGE_SIZE = 100
+LIST_STREAM_CHUNK_SIZE = 500
+MY_LISTS_PAGE_SIZE = 50
+SEARCH_PAGE_SIZE = 20
+AUTOCOMPLETE_CACHE_SIZE = 256
+AUTOCOMPLETE_CACHE_TTL = 5 * 60
+AUTOCOMPLETE_LIMIT = 8
+
+# With this on, items that differ only in case or whitespace count as
+# duplicates. Run `manage.py rehash_items` after changing it.
+NORMALIZE_DUPLICATE_ITEMS = 'DJANGO_NORMALIZE_DUPLICATE_ITEMS' in os.environ
+
+# Live list updates. Each open list page holds an event stream (or a long
+# poll) that sits idle until an item is added. A sync worker would be tied
+# up by every one of them, so only ASGI workers hold any; past the limit,
+# pages poll every LIST_EVENTS_RETRY seconds instead. An idle stream costs
+# about 0.3MB, mostly the thread Django keeps for each ASGI request.
+LIST_EVENTS_MAX_CONNECTIONS = 500 if ASGI else 0
+LIST_EVENTS_CHECK_INTERVAL = 2
+LIST_EVENTS_HEARTBEAT = 15
+LIST_EVENTS_POLL_TIMEOUT = 25
+LIST_EVENTS_MAX_AGE = 5 * 60
+LIST_EVENTS_RETRY = 10
@@ -0,0 +1,42 @@
+import os
+import queue
+import threading
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# Under ASGI every request makes its ORM calls from a thread of its own,
+# so CONN_MAX_AGE can't keep a connection open for the next request.
+# Closing hands the connection to a per-process pool instead, and the next
+# request takes it from there without opening the file or running the
+# init_command PRAGMAs again.
+class DatabaseWrapper(base.DatabaseWrapper):
+  def get_new_connection(self, conn_params):
+    try:
+      return _pool(self.alias).get_nowait()
+    except queue.Empty:
+      return super().get_new_connection(conn_params)
+
+  def _close(self):
+    connection = self.connection
+    # A connection left mid-transaction is closed, which rolls it back.
+    if connection is None or self.in_atomic_block or connection.in_transaction:
+      return super()._close()
+    try:
+      _pool(self.alias).put_nowait(connection)
+    except queue.Full:
+      return super()._close()
+
+def _pool(alias):
+  # Connections inherited from the process this worker forked from are
+  # left alone.
+  pid = os.getpid()
+  with _pools_lock:
+    owner, connections = _pools.get(alias, (None, None))
+    if owner != pid:
+      connections = queue.Queue(maxsize=settings.DATABASE_POOL_SIZE)
+      _pools[alias] = (pid, connections)
+    return connections
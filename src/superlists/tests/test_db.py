@@ -0,0 +1,191 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import (
+  RequestFactory,
+  TestCase,
+  TransactionTestCase,
+  override_settings,
+)
+from django.utils import html
+
+from lists.forms import DUPLICATE_ITEM_ERROR, ExistingListItemForm
+from lists.models import Item, List
+from superlists import db
+from superlists.db import (
+  WriteCoalescer,
+  retrying_transaction,
+  write_transaction,
+)
+
+class WriteTransactionTest(TestCase):
+
+  def setUp(self):
+    self.factory = RequestFactory()
+    self.sleep = mock.patch('superlists.db.time.sleep').start()
+    self.addCleanup(mock.patch.stopall)
+
+  def test_retries_while_database_is_locked(self):
+    view = mock.Mock(side_effect=[
+      OperationalError('database is locked'),
+      OperationalError('database is locked'),
+      HttpResponse('ok'),
+    ])
+    response = write_transaction(view)(self.factory.post('/'))
+    self.assertEqual(response.content, b'ok')
+    self.assertEqual(view.call_count, 3)
+    self.assertEqual(self.sleep.call_count, 2)
+
+  def test_gives_up_after_bounded_attempts(self):
+    view = mock.Mock(side_effect=OperationalError('database is locked'))
+    with self.assertRaises(OperationalError):
+      write_transaction(view)(self.factory.post('/'))
+    self.assertEqual(view.call_count, 5)
+
+  def test_does_not_retry_other_errors(self):
+    view = mock.Mock(side_effect=OperationalError('no such table: x'))
+    with self.assertRaises(OperationalError):
+      write_transaction(view)(self.factory.post('/'))
+    self.assertEqual(view.call_count, 1)
+
+  @mock.patch('superlists.db.transaction.atomic')
+  def test_runs_view_in_a_transaction(self, mock_atomic):
+    write_transaction(mock.Mock())(self.factory.post('/'))
+    self.assertTrue(mock_atomic.return_value.__enter__.called)
+
+  def test_other_methods_are_passed_through(self):
+    view = mock.Mock(side_effect=OperationalError('database is locked'))
+    with self.assertRaises(OperationalError):
+      write_transaction(view)(self.factory.get('/'))
+    self.assertEqual(view.call_count, 1)
+
+  def test_methods_can_be_configured(self):
+    view = mock.Mock(side_effect=[
+      OperationalError('database is locked'),
+      HttpResponse('ok'),
+    ])
+    decorated = write_transaction(methods=('GET',))(view)
+    self.assertEqual(decorated(self.factory.get('/')).content, b'ok')
+
+  def test_retrying_transaction_passes_arguments_through(self):
+    func = mock.Mock(side_effect=[OperationalError('database is locked'), 3])
+    self.assertEqual(retrying_transaction(func)(1, b=2), 3)
+    self.assertEqual(func.call_args, mock.call(1, b=2))
+
+
+def add_item(current_list, text):
+  form = ExistingListItemForm(for_list=current_list, data={'text': text})
+  return form, form.is_valid() and form.save()
+
+# The coalescer commits from its own thread and connection, so these tests
+# can't run inside a test transaction.
+class WriteCoalescerTest(TransactionTestCase):
+
+  def setUp(self):
+    # A long window, so everything submitted below lands in one batch.
+    self.coalescer = WriteCoalescer(window=0.2, max_batch=10)
+    self.addCleanup(self.coalescer.stop)
+    self.list = List.objects.create()
+
+  def test_commits_concurrent_writes_together(self):
+    futures = [
+      self.coalescer.submit(add_item, self.list, f'item {n}')
+      for n in range(3)
+    ]
+    results = [future.result(timeout=5) for future in futures]
+    self.assertTrue(all(item for _, item in results))
+    self.assertEqual(self.coalescer.commits, 1)
+    self.assertEqual(Item.objects.count(), 3)
+    self.assertEqual(List.objects.get().item_count, 3)
+
+  def test_duplicates_are_reported_to_their_own_caller(self):
+    futures = [
+      self.coalescer.submit(add_item, self.list, text)
+      for text in ['milk', 'milk', 'eggs']
+    ]
+    (_, first), (form, duplicate), (_, other) = [
+      future.result(timeout=5) for future in futures
+    ]
+    self.assertTrue(first)
+    self.assertIsNone(duplicate)
+    self.assertEqual(form.errors['text'], [DUPLICATE_ITEM_ERROR])
+    self.assertTrue(other)
+    self.assertEqual(
+      sorted(Item.objects.values_list('text', flat=True)), ['eggs', 'milk']
+    )
+
+  def test_an_exception_only_rolls_back_its_own_writes(self):
+    def fail(current_list):
+      Item.objects.create(list=current_list, text='rolled back')
+      raise ValueError('nope')
+
+    failing = self.coalescer.submit(fail, self.list)
+    saving = self.coalescer.submit(add_item, self.list, 'kept')
+    self.assertIsInstance(failing.exception(timeout=5), ValueError)
+    self.assertTrue(saving.result(timeout=5)[1])
+    self.assertEqual(
+      list(Item.objects.values_list('text', flat=True)), ['kept']
+    )
+
+  def test_batches_are_capped(self):
+    futures = [
+      self.coalescer.submit(add_item, self.list, f'item {n}')
+      for n in range(12)
+    ]
+    for future in futures:
+      future.result(timeout=5)
+    self.assertEqual(self.coalescer.commits, 2)
+
+  @mock.patch('superlists.db.time.sleep')
+  def test_retries_the_whole_batch_while_database_is_locked(self, sleep):
+    calls = []
+    def locked_once():
+      calls.append(1)
+      if len(calls) == 1:
+        raise OperationalError('database is locked')
+      return 'ok'
+
+    self.assertEqual(
+      self.coalescer.submit(locked_once).result(timeout=5), 'ok'
+    )
+    self.assertEqual(len(calls), 2)
+
+
+@override_settings(WRITE_COALESCING=True)
+class CoalescedViewsTest(TransactionTestCase):
+
+  def setUp(self):
+    self.addCleanup(self.stop_coalescer)
+
+  def stop_coalescer(self):
+    if db._coalescer is not None:
+      db._coalescer.stop()
+      db._coalescer = None
+
+  async def test_adding_an_item_goes_through_the_coalescer(self):
+    current_list = await List.objects.acreate()
+    response = await self.async_client.post(
+      f'/lists/{current_list.id}/', data={'text': 'milk'}
+    )
+    self.assertRedirects(
+      response, f'/lists/{current_list.id}/', fetch_redirect_response=False
+    )
+    self.assertEqual(db.coalescer().commits, 1)
+    self.assertTrue(await Item.objects.filter(text='milk').aexists())
+
+  async def test_duplicate_error_reaches_the_page(self):
+    current_list = await List.objects.acreate()
+    await Item.objects.acreate(list=current_list, text='milk')
+    response = await self.async_client.post(
+      f'/lists/{current_list.id}/', data={'text': 'milk'}
+    )
+    self.assertContains(response, html.escape(DUPLICATE_ITEM_ERROR))
+
+  async def test_new_list_goes_through_the_coalescer(self):
+    response = await self.async_client.post(
+      '/lists/new', data={'text': 'milk'}
+    )
+    new_list = await List.objects.aget()
+    self.assertEqual(response['Location'], new_list.get_absolute_url())
+    self.assertEqual(db.coalescer().commits, 1)
@@ -0,0 +1,186 @@
+import json
+import os
+import subprocess
+import tempfile
+import time
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from accounts.models import Token
+from lists.models import Item, List
+from superlists import metrics
+
+def counter(name, **labels):
+  key = (name, tuple(sorted(labels.items())))
+  return metrics.registry.counters.get(key, 0)
+
+
+class RegistryTest(TestCase):
+
+  def test_histogram_buckets_are_cumulative(self):
+    registry = metrics.Registry()
+    registry.observe('superlists_request_duration_seconds', 0.003, view='home')
+    registry.observe('superlists_request_duration_seconds', 0.2, view='home')
+    output = registry.render()
+    self.assertIn(
+      'superlists_request_duration_seconds_bucket{view="home",le="0.005"} 1',
+      output
+    )
+    self.assertIn(
+      'superlists_request_duration_seconds_bucket{view="home",le="0.25"} 2',
+      output
+    )
+    self.assertIn(
+      'superlists_request_duration_seconds_count{view="home"} 2', output
+    )
+
+  def test_merges_snapshots_of_other_processes(self):
+    one, two = metrics.Registry(), metrics.Registry()
+    one.inc('superlists_logins_total')
+    two.inc('superlists_logins_total', 2)
+    two.observe('superlists_request_duration_seconds', 0.1, view='login')
+    merged = metrics.Registry()
+    merged.merge(json.loads(json.dumps(one.snapshot())))
+    merged.merge(json.loads(json.dumps(two.snapshot())))
+    output = merged.render()
+    self.assertIn('superlists_logins_total 3', output)
+    self.assertIn(
+      'superlists_request_duration_seconds_count{view="login"} 1', output
+    )
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsViewTest(TestCase):
+
+  def get_metrics(self):
+    return self.client.get(
+      '/metrics', headers={'Authorization': 'Bearer secret'}
+    )
+
+  def write_worker_file(self, metrics_dir, pid, registry):
+    path = os.path.join(metrics_dir, f'{pid}-abc.json')
+    with open(path, 'w') as f:
+      json.dump(registry.snapshot(), f)
+    return path
+
+  def test_reports_latency_and_status_per_url_name(self):
+    self.client.get('/')
+    response = self.get_metrics()
+    self.assertEqual(response.status_code, 200)
+    self.assertContains(
+      response, 'superlists_request_duration_seconds_bucket{view="home"'
+    )
+    self.assertContains(
+      response, 'superlists_responses_total{status="200",view="home"}'
+    )
+
+  def test_adds_up_the_files_of_every_worker(self):
+    with tempfile.TemporaryDirectory() as metrics_dir:
+      other_worker = metrics.Registry()
+      other_worker.inc('superlists_logins_total', 1000)
+      self.write_worker_file(metrics_dir, os.getppid(), other_worker)
+      expected = counter('superlists_logins_total') + 1000
+      with override_settings(METRICS_DIR=metrics_dir):
+        response = self.get_metrics()
+        self.assertEqual(len(os.listdir(metrics_dir)), 2)
+    self.assertContains(response, f'superlists_logins_total {expected}\n')
+
+  def test_requests_leave_writing_the_file_to_a_thread(self):
+    with tempfile.TemporaryDirectory() as metrics_dir:
+      with override_settings(METRICS_DIR=metrics_dir):
+        with mock.patch.object(metrics, 'start_flusher') as start_flusher:
+          self.client.get('/')
+        self.assertEqual(os.listdir(metrics_dir), [])
+    start_flusher.assert_called()
+
+  def test_flusher_writes_the_file_every_interval(self):
+    with tempfile.TemporaryDirectory() as metrics_dir:
+      with override_settings(
+        METRICS_DIR=metrics_dir, METRICS_FLUSH_INTERVAL=0.01
+      ):
+        metrics.start_flusher()
+        deadline = time.monotonic() + 5
+        while not os.listdir(metrics_dir) and time.monotonic() < deadline:
+          time.sleep(0.01)
+        [name] = os.listdir(metrics_dir)
+    self.assertTrue(name.startswith(f'{os.getpid()}-'))
+
+  def test_files_of_exited_workers_are_removed(self):
+    exited = subprocess.Popen(['true'])
+    exited.wait()
+    with tempfile.TemporaryDirectory() as metrics_dir:
+      dead_worker = metrics.Registry()
+      dead_worker.inc('superlists_logins_total', 1000)
+      path = self.write_worker_file(metrics_dir, exited.pid, dead_worker)
+      expected = counter('superlists_logins_total')
+      with override_settings(METRICS_DIR=metrics_dir):
+        response = self.get_metrics()
+      self.assertFalse(os.path.exists(path))
+    self.assertContains(response, f'superlists_logins_total {expected}\n')
+
+  def test_token_is_required(self):
+    self.assertEqual(self.client.get('/metrics').status_code, 403)
+    self.assertEqual(self.get_metrics().status_code, 200)
+
+  @override_settings(METRICS_TOKEN=None)
+  def test_refused_without_a_token_in_production(self):
+    self.assertEqual(self.client.get('/metrics').status_code, 403)
+
+  @override_settings(METRICS_TOKEN=None, DEBUG=True)
+  def test_open_without_a_token_when_debugging(self):
+    self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+
+class BusinessCountersTest(TestCase):
+
+  def test_counts_new_lists_and_items(self):
+    lists = counter('superlists_lists_created_total')
+    items = counter('superlists_items_added_total')
+    with self.captureOnCommitCallbacks(execute=True):
+      self.client.post('/lists/new', data={'text': 'first'})
+      self.client.post(
+        f'/lists/{List.objects.get().id}/import', data={'items': 'a\nb'}
+      )
+    self.assertEqual(counter('superlists_lists_created_total'), lists + 1)
+    self.assertEqual(counter('superlists_items_added_total'), items + 3)
+
+  def test_counts_duplicate_items(self):
+    current_list = List.objects.create()
+    Item.objects.create(list=current_list, text='dup')
+    before = counter('superlists_duplicate_items_total')
+    with self.captureOnCommitCallbacks(execute=True):
+      self.client.post(f'/lists/{current_list.id}/', data={'text': 'dup'})
+      self.client.post(
+        f'/lists/{current_list.id}/import', data={'items': 'dup\nnew\nnew'}
+      )
+    self.assertEqual(counter('superlists_duplicate_items_total'), before + 3)
+
+  def test_counts_tokens_and_logins(self):
+    tokens = counter('superlists_login_tokens_issued_total')
+    logins = counter('superlists_logins_total')
+    with self.captureOnCommitCallbacks(execute=True):
+      self.client.post(
+        reverse('send_login_email'), data={'email': 'edith@example.com'}
+      )
+    token = Token.objects.get()
+    self.client.get(reverse('login', query={'token': token.uid}))
+    self.assertEqual(
+      counter('superlists_login_tokens_issued_total'), tokens + 1
+    )
+    self.assertEqual(counter('superlists_logins_total'), logins + 1)
+
+  def test_rolled_back_writes_are_not_counted(self):
+    lists = counter('superlists_lists_created_total')
+    items = counter('superlists_items_added_total')
+    with self.captureOnCommitCallbacks(execute=True):
+      try:
+        with transaction.atomic():
+          Item.objects.create(list=List.objects.create(), text='gone')
+          raise RuntimeError
+      except RuntimeError:
+        pass
+    self.assertEqual(counter('superlists_lists_created_total'), lists)
+    self.assertEqual(counter('superlists_items_added_total'), items)
@@ -0,0 +1,104 @@
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import User
+from lists.models import List
+from superlists import timing
+
+class ResolveUserMiddlewareTest(TestCase):
+
+  def setUp(self):
+    self.user = User.objects.create(email='edith@example.com')
+
+  def test_async_views_get_the_logged_in_user(self):
+    self.client.force_login(self.user)
+    response = self.client.get('/')
+    self.assertEqual(response.wsgi_request.user, self.user)
+    self.assertContains(response, 'Logged in as edith@example.com')
+
+  async def test_user_is_loaded_before_an_async_view_runs(self):
+    await self.async_client.aforce_login(self.user)
+    response = await self.async_client.get('/')
+    self.assertIsInstance(response.asgi_request.user, User)
+    self.assertContains(response, 'Logged in as edith@example.com')
+
+  async def test_anonymous_user_is_loaded_too(self):
+    response = await self.async_client.get('/')
+    self.assertIsInstance(response.asgi_request.user, AnonymousUser)
+
+  def log_in_with_email_as_user_id(self, client):
+    session = self.client.session
+    session[SESSION_KEY] = self.user.email
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session.save()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+  def test_sessions_from_before_integer_ids_are_logged_out(self):
+    self.log_in_with_email_as_user_id(self.client)
+    response = self.client.get('/')
+    self.assertIsInstance(response.wsgi_request.user, AnonymousUser)
+    self.assertNotIn(SESSION_KEY, response.wsgi_request.session)
+
+  async def test_async_sessions_from_before_integer_ids_are_logged_out(self):
+    await sync_to_async(self.log_in_with_email_as_user_id)(self.async_client)
+    response = await self.async_client.get('/')
+    self.assertIsInstance(response.asgi_request.user, AnonymousUser)
+    self.assertContains(response, 'Enter your email to log in')
+
+
+class RequestTimingMiddlewareTest(TestCase):
+
+  def server_timing(self, response):
+    return dict(
+      metric.split(';', 1)
+      for metric in response['Server-Timing'].split(', ')
+    )
+
+  def test_reports_query_count_in_server_timing(self):
+    user = User.objects.create(email='edith@example.com')
+    List.objects.create(owner=user)
+    with CaptureQueriesContext(connection) as queries:
+      response = self.client.get('/lists/users/edith@example.com/')
+    metrics = self.server_timing(response)
+    self.assertIn(f'desc="{len(queries)} queries"', metrics['db'])
+    self.assertIn('template', metrics)
+    self.assertIn('total', metrics)
+
+  def test_logs_one_json_line_per_request(self):
+    with self.assertLogs('superlists.requests', 'INFO') as logs:
+      self.client.get('/')
+    [line] = logs.records
+    record = json.loads(line.getMessage())
+    self.assertEqual(record['view'], 'home')
+    self.assertEqual(record['status'], 200)
+    self.assertGreater(record['template_ms'], 0)
+    self.assertNotIn('over_budget', record)
+
+  @override_settings(REQUEST_BUDGETS={'queries': 0, 'total_ms': 10_000})
+  def test_requests_over_budget_are_logged_as_warnings(self):
+    User.objects.create(email='edith@example.com')
+    with self.assertLogs('superlists.requests', 'INFO') as logs:
+      self.client.get('/lists/users/edith@example.com/')
+    [line] = logs.records
+    self.assertEqual(line.levelname, 'WARNING')
+    self.assertEqual(json.loads(line.getMessage())['over_budget'], ['queries'])
+
+  async def test_counts_queries_of_async_views(self):
+    await sync_to_async(timing.instrument)(connection)
+    await User.objects.acreate(email='edith@example.com')
+    response = await self.async_client.get('/lists/users/edith@example.com/')
+    self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+
+  def test_new_connections_are_instrumented(self):
+    new_connection = mock.Mock(execute_wrappers=[])
+    connection_created.send(sender=None, connection=new_connection)
+    self.assertEqual(new_connection.execute_wrappers, [timing.record_query])
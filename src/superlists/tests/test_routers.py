@@ -0,0 +1,73 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+
+from lists.models import List
+from superlists.routers import ReadWriteRouter, read_your_writes_middleware
+
+def run_request(view):
+  return read_your_writes_middleware(view)(RequestFactory().get('/'))
+
+
+class ReadWriteRouterTest(TestCase):
+
+  def setUp(self):
+    self.router = ReadWriteRouter()
+
+  def test_writes_go_to_writer(self):
+    self.assertEqual(self.router.db_for_write(List), 'default')
+
+  def test_reads_stay_on_writer_after_a_write(self):
+    routes = []
+    def view(request):
+      self.router.db_for_write(List)
+      routes.append(self.router.db_for_read(List))
+      return HttpResponse()
+    run_request(view)
+    self.assertEqual(routes, ['default'])
+
+  def test_reads_inside_a_writer_transaction_stay_on_writer(self):
+    # TestCase wraps every test in a transaction on the writer.
+    self.assertEqual(self.router.db_for_read(List), 'default')
+
+  def test_only_default_is_migrated(self):
+    self.assertTrue(self.router.allow_migrate('default', 'lists'))
+    self.assertFalse(self.router.allow_migrate('reader', 'lists'))
+
+
+class ReadWriteRouterOutsideTransactionTest(SimpleTestCase):
+
+  def setUp(self):
+    self.router = ReadWriteRouter()
+
+  def test_reads_go_to_reader(self):
+    routes = []
+    def view(request):
+      routes.append(self.router.db_for_read(List))
+      return HttpResponse()
+    run_request(view)
+    self.assertEqual(routes, ['reader'])
+
+  def test_each_request_starts_on_reader(self):
+    routes = []
+    def writing_view(request):
+      self.router.db_for_write(List)
+      return HttpResponse()
+    def reading_view(request):
+      routes.append(self.router.db_for_read(List))
+      return HttpResponse()
+    run_request(writing_view)
+    run_request(reading_view)
+    self.assertEqual(routes, ['reader'])
+
+  async def test_async_requests_start_on_reader(self):
+    routes = []
+    async def writing_view(request):
+      self.router.db_for_write(List)
+      routes.append(self.router.db_for_read(List))
+      return HttpResponse()
+    async def reading_view(request):
+      routes.append(self.router.db_for_read(List))
+      return HttpResponse()
+    await read_your_writes_middleware(writing_view)(RequestFactory().get('/'))
+    await read_your_writes_middleware(reading_view)(RequestFactory().get('/'))
+    self.assertEqual(routes, ['default', 'reader'])
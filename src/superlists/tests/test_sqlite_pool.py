@@ -0,0 +1,63 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.db import connections
+from django.test import SimpleTestCase, override_settings
+
+from superlists.sqlite_pool import base
+from superlists.sqlite_pool.base import DatabaseWrapper
+
+@override_settings(DATABASE_POOL_SIZE=1)
+class SQLitePoolTest(SimpleTestCase):
+
+  def setUp(self):
+    directory = tempfile.TemporaryDirectory()
+    self.addCleanup(directory.cleanup)
+    self.settings_dict = {
+      **connections.settings['default'],
+      'NAME': os.path.join(directory.name, 'db.sqlite3'),
+      'CONN_MAX_AGE': 0,
+    }
+    patcher = mock.patch.object(base, '_pools', {})
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def connect(self):
+    wrapper = DatabaseWrapper(self.settings_dict, alias='pool-test')
+    self.addCleanup(wrapper.close)
+    wrapper.ensure_connection()
+    return wrapper
+
+  def test_closed_connection_is_reused_without_running_init_commands(self):
+    first = self.connect()
+    sqlite_connection = first.connection
+    first.close()
+    with mock.patch.object(
+      base.base.DatabaseWrapper, 'get_new_connection'
+    ) as get_new_connection:
+      second = self.connect()
+    get_new_connection.assert_not_called()
+    self.assertIs(second.connection, sqlite_connection)
+
+  def test_pool_keeps_at_most_its_size(self):
+    first, second = self.connect(), self.connect()
+    kept = first.connection
+    first.close()
+    second.close()
+    self.assertIs(self.connect().connection, kept)
+    self.assertIsNot(self.connect().connection, kept)
+
+  def test_connection_closed_in_a_transaction_is_not_reused(self):
+    first = self.connect()
+    sqlite_connection = first.connection
+    first.connection.execute('BEGIN')
+    first.close()
+    self.assertIsNot(self.connect().connection, sqlite_connection)
+
+  def test_forked_worker_opens_its_own_connections(self):
+    first = self.connect()
+    sqlite_connection = first.connection
+    first.close()
+    with mock.patch.object(base.os, 'getpid', return_value=-1):
+      self.assertIsNot(self.connect().connection, sqlite_connection)
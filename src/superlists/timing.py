@@ -0,0 +1,60 @@
+import contextvars
+import time
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates, Template
+
+# The timings of the request being handled. sync_to_async copies the
+# context, so ORM calls made from async views still add to the same object.
+current = contextvars.ContextVar('request_timings', default=None)
+
+class RequestTimings:
+  def __init__(self):
+    self.start = time.perf_counter()
+    self.queries = 0
+    self.db = 0.0
+    self.template = 0.0
+
+  def elapsed(self):
+    return time.perf_counter() - self.start
+
+
+def record_query(execute, sql, params, many, context):
+  timings = current.get()
+  if timings is None:
+    return execute(sql, params, many, context)
+  start = time.perf_counter()
+  try:
+    return execute(sql, params, many, context)
+  finally:
+    timings.queries += 1
+    timings.db += time.perf_counter() - start
+
+def instrument(connection):
+  if record_query not in connection.execute_wrappers:
+    connection.execute_wrappers.insert(0, record_query)
+
+@receiver(connection_created)
+def instrument_new_connection(sender, connection, **kwargs):
+  instrument(connection)
+
+
+class TimedTemplate(Template):
+  def render(self, context=None, request=None):
+    timings = current.get()
+    if timings is None:
+      return super().render(context, request)
+    start = time.perf_counter()
+    try:
+      return super().render(context, request)
+    finally:
+      timings.template += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+  def from_string(self, template_code):
+    return TimedTemplate(super().from_string(template_code).template, self)
+
+  def get_template(self, template_name):
+    return TimedTemplate(super().get_template(template_name).template, self)
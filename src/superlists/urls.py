@@ -1,9 +1,12 @@
 from django.urls import include, path
 
 import lists.views as list_views
+from superlists.metrics import metrics_view
 
 urlpatterns = [
     path('', list_views.home_page, name='home'),
     path('accounts/', include('accounts.urls')),
     path('lists/', include('lists.urls')),
+    path('api/', include('lists.api_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]